@@ -1,7 +1,9 @@
 """Recommendation API endpoints."""
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from db.database import get_db
 from services.recommendation import (
     RecommendationRequest,
     RecommendationResponse,
@@ -17,7 +19,10 @@ router = APIRouter(prefix="/recommendation", tags=["Recommendation"])
 
 
 @router.post("/similar", response_model=RecommendationResponse)
-async def get_similar_articles(request: RecommendationRequest):
+async def get_similar_articles(
+    request: RecommendationRequest,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get similar news articles based on content similarity.
     
@@ -31,6 +36,7 @@ async def get_similar_articles(request: RecommendationRequest):
         
         recommendations, is_cached = await recommendation_service.get_similar_articles(
             news_id=request.news_id,
+            db=db,
             limit=request.limit,
             category_filter=request.category_filter
         )
@@ -52,7 +58,10 @@ async def get_similar_articles(request: RecommendationRequest):
 
 
 @router.post("/index", response_model=IndexResponse)
-async def index_article(request: IndexArticleRequest):
+async def index_article(
+    request: IndexArticleRequest,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Generate and store embedding for a single news article.
     
@@ -62,7 +71,7 @@ async def index_article(request: IndexArticleRequest):
     try:
         logger.info(f"Index request for news_id={request.news_id}")
         
-        indexed = await recommendation_service.index_article(request.news_id)
+        indexed = await recommendation_service.index_article(request.news_id, db)
         
         return IndexResponse(
             success=True,
@@ -80,7 +89,10 @@ async def index_article(request: IndexArticleRequest):
 
 
 @router.post("/index/batch", response_model=IndexResponse)
-async def index_articles_batch(request: IndexBatchRequest):
+async def index_articles_batch(
+    request: IndexBatchRequest,
+    db: AsyncSession = Depends(get_db)
+):
     """
     Generate and store embeddings for a batch of articles.
     
@@ -92,6 +104,7 @@ async def index_articles_batch(request: IndexBatchRequest):
         logger.info(f"Batch index request: page={request.page}, size={request.size}, category={request.category}")
         
         indexed, skipped = await recommendation_service.index_articles_batch(
+            db=db,
             page=request.page,
             size=request.size,
             category=request.category
@@ -116,7 +129,7 @@ async def index_articles_batch(request: IndexBatchRequest):
 async def get_stats():
     """Get embedding index statistics."""
     try:
-        stats = recommendation_service.get_embedding_stats()
+        stats = await recommendation_service.get_embedding_stats()
         return {
             "status": "healthy",
             "service": "Content-Based Recommendation",
@@ -1,10 +1,11 @@
 """Summarization API endpoints."""
 import logging
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
+from api.http_cache import make_etag, etag_matches
 from db.database import get_db
 from services.summarization.models import NewsSummarizationResponse
 from services.summarization.news_summarization_service import news_summarization_service
@@ -26,7 +27,7 @@ async def summarize_news(
         default=False,
         description="Force regeneration even if cached summaries exist"
     ),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Generate summaries for a news article.
@@ -77,20 +78,28 @@ async def summarize_news(
 @router.get("/news/{news_id}", response_model=NewsSummarizationResponse)
 async def get_summaries(
     news_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Get cached summaries for a news article (no generation).
 
-    Returns 404 if no cached summaries exist.
+    Returns 404 if no cached summaries exist, and 304 when the client's
+    If-None-Match already matches the current ETag.
     """
-    result = news_summarization_service.get_cached_summaries(news_id, db)
+    result = await news_summarization_service.get_cached_summaries(news_id, db)
     if not result:
         raise HTTPException(
             status_code=404,
             detail=f"No cached summaries found for news_id={news_id}"
         )
 
+    etag = make_etag(result)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     return NewsSummarizationResponse(
         success=True,
         news_id=result[KEY_NEWS_ID],
@@ -1,12 +1,15 @@
 import logging
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from pathlib import Path
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.http_cache import make_etag, etag_matches
 from db.database import get_db
+from services.constants import AUDIO_CONTENT_TYPES, DEFAULT_AUDIO_CONTENT_TYPE
+from services.tts.audio_stream import HAS_PYAV, encode_ogg_opus
 from services.tts import (
-    TTSRequest, TTSResponse, AudioInfo, NewsTTSResponse,
+    TTSRequest, TTSResponse, NewsTTSResponse, AUDIO_INFO_LIST_ADAPTER,
     tts_service, news_tts_service, AVAILABLE_VOICES
 )
 
@@ -39,6 +42,69 @@ async def list_voices():
         )
 
 
+@router.post("/stream")
+async def stream_speech(request: TTSRequest):
+    """
+    Synthesize speech and stream it back as Ogg/Opus.
+    
+    Audio is produced sentence by sentence and encoded on the fly, so the
+    first bytes arrive after the first sentence instead of after the whole
+    text, nothing is written to disk and the payload is roughly 10x
+    smaller than WAV.
+    
+    Returns:
+        Chunked audio/ogg response
+    """
+    if not HAS_PYAV:
+        raise HTTPException(
+            status_code=501,
+            detail="Audio streaming requires PyAV to be installed"
+        )
+
+    logger.info(f"Streaming TTS request: {request.text[:50]}...")
+    pcm_chunks = tts_service.synthesize_stream(
+        text=request.text,
+        voice_id=request.voice_id,
+        ref_audio=request.ref_audio,
+        ref_text=request.ref_text
+    )
+    return StreamingResponse(
+        encode_ogg_opus(pcm_chunks, tts_service.sample_rate),
+        media_type="audio/ogg"
+    )
+
+
+@router.get("/audio/{filename}")
+async def get_audio_file(filename: str):
+    """
+    Download a locally stored TTS audio file.
+    
+    The file is stat'ed once (existence and regular-file check included)
+    and the result handed to FileResponse, so Content-Length/ETag/
+    Last-Modified are set without another stat and Range requests from
+    audio players can be served directly from disk.
+    
+    Args:
+        filename: Audio filename returned by the TTS service
+        
+    Returns:
+        The audio file (WAV or Ogg/Opus), or 404 if it does not exist
+    """
+    audio_file = tts_service.get_audio_file(Path(filename).name)
+    if audio_file is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Audio file not found: {filename}"
+        )
+
+    file_path, stat_result = audio_file
+    return FileResponse(
+        file_path,
+        media_type=AUDIO_CONTENT_TYPES.get(file_path.suffix, DEFAULT_AUDIO_CONTENT_TYPE),
+        filename=file_path.name,
+        stat_result=stat_result
+    )
+
 
 @router.get("/health")
 async def health_check():
@@ -53,7 +119,7 @@ async def health_check():
 @router.post("/news/{news_id}", response_model=NewsTTSResponse)
 async def generate_tts_for_news(
     news_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Generate TTS audio for a news article.
@@ -82,17 +148,7 @@ async def generate_tts_for_news(
         )
         
         # Convert to AudioInfo models
-        audio_info_list = [
-            AudioInfo(
-                voice_id=af.get("voice_id"),
-                description=af.get("description"),
-                url=af.get("url"),
-                s3_key=af.get("s3_key"),
-                presigned_url=af.get("presigned_url"),
-                filename=af.get("filename")
-            )
-            for af in audio_files
-        ]
+        audio_info_list = AUDIO_INFO_LIST_ADAPTER.validate_python(audio_files)
         
         message = "Trả về từ cache" if cached else "Đã tạo audio thành công"
         
@@ -126,7 +182,9 @@ async def generate_tts_for_news(
 @router.get("/news/{news_id}", response_model=NewsTTSResponse)
 async def get_news_audio(
     news_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get cached TTS audio for a news article (without generating if not exists).
@@ -136,27 +194,26 @@ async def get_news_audio(
         news_id: ID of the news article
         
     Returns:
-        NewsTTSResponse with cached audio files or 404 if not found
+        NewsTTSResponse with cached audio files, 404 if not found,
+        or 304 if the client's If-None-Match matches the current ETag
     """
-    cached_audio = await news_tts_service.get_cached_audio(news_id=news_id, db=db)
+    stored_audio = await news_tts_service.get_stored_audio(news_id=news_id, db=db)
     
-    if not cached_audio:
+    if not stored_audio:
         raise HTTPException(
             status_code=404,
             detail=f"Không tìm thấy audio cho bài viết {news_id}. Sử dụng POST để tạo mới."
         )
     
-    audio_info_list = [
-        AudioInfo(
-            voice_id=af.get("voice_id"),
-            description=af.get("description"),
-            url=af.get("url"),
-            s3_key=af.get("s3_key"),
-            presigned_url=af.get("presigned_url"),
-            filename=af.get("filename")
-        )
-        for af in cached_audio
-    ]
+    # ETag over the stored rows (s3_key, voice, ...), not the presigned URLs,
+    # which are re-signed on every cache expiry
+    etag = make_etag(stored_audio)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    cached_audio = await news_tts_service.with_presigned_urls(stored_audio)
+    audio_info_list = AUDIO_INFO_LIST_ADAPTER.validate_python(cached_audio)
     
     return NewsTTSResponse(
         news_id=news_id,
@@ -169,7 +226,7 @@ async def get_news_audio(
 @router.delete("/news/{news_id}")
 async def delete_news_audio(
     news_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete cached TTS audio for a news article.
@@ -0,0 +1,20 @@
+"""ETag helpers for conditional GET responses."""
+import hashlib
+
+import orjson
+from fastapi import Request
+
+
+def make_etag(payload) -> str:
+    """Build a strong ETag from a JSON-serializable payload."""
+    body = orjson.dumps(payload, default=str, option=orjson.OPT_SORT_KEYS)
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header matches an ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
@@ -5,6 +5,5 @@ from api.endpoints import tts, recommendation, summarization
 api_router = APIRouter()
 
 # Include all feature routers
-api_router.include_router(tts.router)
-api_router.include_router(recommendation.router)
-api_router.include_router(summarization.router)
+for endpoint_module in (tts, recommendation, summarization):
+    api_router.include_router(endpoint_module.router)
@@ -1,5 +1,16 @@
 """Database package for IntelliNews AI Service."""
-from .database import engine, SessionLocal, Base, get_db
-from .models import NewsAIResult
+from .database import engine, SessionLocal, async_engine, AsyncSessionLocal, Base, get_db
+from .models import NewsAIResult, NewsAudioFile, NewsEmbedding, EmbeddingCache
 
-__all__ = ["engine", "SessionLocal", "Base", "get_db", "NewsAIResult"]
+__all__ = [
+    "engine",
+    "SessionLocal",
+    "async_engine",
+    "AsyncSessionLocal",
+    "Base",
+    "get_db",
+    "NewsAIResult",
+    "NewsAudioFile",
+    "NewsEmbedding",
+    "EmbeddingCache",
+]
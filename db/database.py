@@ -2,17 +2,18 @@
 import logging
 
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
 
 from config import settings
 
 logger = logging.getLogger(__name__)
 
-# Create SQLAlchemy engine
+# Create SQLAlchemy engine (startup/maintenance work; requests use async_engine)
 engine = create_engine(
     settings.database_url,
-    pool_pre_ping=True,  # Enable connection health checks
+    pool_pre_ping=settings.db_pool_pre_ping,  # Enable connection health checks
+    pool_recycle=settings.db_pool_recycle,
     pool_size=5,
     max_overflow=10
 )
@@ -20,22 +21,43 @@ engine = create_engine(
 # Create SessionLocal class for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_database_url(url: str) -> str:
+    """Rewrite a postgresql:// URL to use the asyncpg driver."""
+    scheme, _, rest = url.partition("://")
+    return f"postgresql+asyncpg://{rest}" if scheme.startswith("postgresql") else url
+
+
+# Async engine for request handlers (native asyncio I/O, no threadpool hop)
+async_engine = create_async_engine(
+    _async_database_url(settings.database_url),
+    pool_pre_ping=settings.db_pool_pre_ping,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Create Base class for declarative models
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """
-    Dependency that provides database session.
+    Dependency that provides an async database session.
     
     Yields:
-        Database session that will be closed after request.
+        AsyncSession that will be closed after request.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def init_db():
@@ -1,11 +1,18 @@
 """SQLAlchemy models for IntelliNews AI Service."""
-from sqlalchemy import Column, BigInteger, Text, DateTime, String
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import (
+    Column, BigInteger, Text, DateTime, String, Index, ForeignKey, UniqueConstraint
+)
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC, Vector
 
+from config import settings
 from .database import Base
 
+# Stored precision of news embeddings; halfvec halves row and HNSW page size
+EmbeddingVector = HALFVEC if settings.db_embedding_dtype == "halfvec" else Vector
+EMBEDDING_OPS = f"{settings.db_embedding_dtype}_cosine_ops"
+
 
 class NewsAIResult(Base):
     """
@@ -15,7 +22,7 @@ class NewsAIResult(Base):
     Attributes:
         id: Primary key
         news_id: Reference to news_items.id in news-service (unique)
-        audio_files: JSONB array of audio file info
+        audio_files: Generated audio files, one NewsAudioFile per voice
         summary_short: Short summary of the news
         summary_medium: Medium-length summary
         summary_default: Default/full summary
@@ -24,12 +31,16 @@ class NewsAIResult(Base):
     """
     __tablename__ = "news_ai_results"
 
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
-    news_id = Column(BigInteger, unique=True, nullable=False, index=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    news_id = Column(BigInteger, unique=True, nullable=False)
     
-    # JSONB array storing audio file information
-    # Format: [{"voice_id": "Doan", "description": "Giọng nam miền Bắc", "url": "...", "s3_key": "...", "presigned_url": "..."}]
-    audio_files = Column(JSONB, nullable=False, default=[])
+    # One row per voice in news_audio_files (loaded together with the result)
+    audio_files = relationship(
+        "NewsAudioFile",
+        lazy="selectin",
+        cascade="all, delete-orphan",
+        order_by="NewsAudioFile.id",
+    )
     
     # Summary fields (moved from news-service)
     summary_short = Column(Text, nullable=True)
@@ -41,7 +52,52 @@ class NewsAIResult(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     def __repr__(self):
-        return f"<NewsAIResult(id={self.id}, news_id={self.news_id}, audio_count={len(self.audio_files or [])})>"
+        return f"<NewsAIResult(id={self.id}, news_id={self.news_id})>"
+
+
+class NewsAudioFile(Base):
+    """
+    Model for one generated TTS audio file of a news item.
+
+    Attributes:
+        id: Primary key
+        news_ai_result_id: Owning NewsAIResult
+        voice_id: TTS voice (unique per result)
+        description: Human-readable voice description
+        url: Public S3 URL
+        s3_key: Object key in the audio bucket
+        filename: Generated file name
+        created_at: Timestamp when the audio was generated
+    """
+    __tablename__ = "news_audio_files"
+    __table_args__ = (
+        UniqueConstraint("news_ai_result_id", "voice_id", name="uq_news_audio_files_result_voice"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    news_ai_result_id = Column(
+        BigInteger, ForeignKey("news_ai_results.id", ondelete="CASCADE"), nullable=False
+    )
+    voice_id = Column(String(50), nullable=False)
+    description = Column(Text, nullable=True)
+    url = Column(Text, nullable=True)
+    s3_key = Column(Text, nullable=True)
+    filename = Column(String(255), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def to_dict(self) -> dict:
+        """Audio info in the API/cache dict format."""
+        return {
+            "voice_id": self.voice_id,
+            "description": self.description,
+            "url": self.url,
+            "s3_key": self.s3_key,
+            "filename": self.filename,
+        }
+
+    def __repr__(self):
+        return f"<NewsAudioFile(id={self.id}, voice_id={self.voice_id}, s3_key={self.s3_key})>"
 
 
 class NewsEmbedding(Base):
@@ -54,17 +110,34 @@ class NewsEmbedding(Base):
         news_id: Reference to news_items.id in news-service (unique)
         category: News category (cached for filtering)
         title: News title (cached for response)
-        embedding: 768-dim PhoBERT CLS embedding (pgvector vector type)
+        embedding: 768-dim PhoBERT CLS embedding (pgvector halfvec, or vector
+            when db_embedding_dtype="vector")
         created_at: Timestamp when embedding was generated
         updated_at: Timestamp when embedding was last updated
     """
     __tablename__ = "news_embeddings"
+    __table_args__ = (
+        # Category filter served by an index-only scan of (news_id, title)
+        Index(
+            "idx_news_embeddings_category_incl",
+            "category",
+            postgresql_include=["news_id", "title"],
+        ),
+        # ANN index for `embedding <=> :query` ordering (see 001_schema.sql)
+        Index(
+            "idx_news_embeddings_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": EMBEDDING_OPS},
+        ),
+    )
 
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
-    news_id = Column(BigInteger, unique=True, nullable=False, index=True)
-    category = Column(String(50), nullable=False, index=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    news_id = Column(BigInteger, unique=True, nullable=False)
+    category = Column(String(50), nullable=False)
     title = Column(Text, nullable=False)
-    embedding = Column(Vector(768), nullable=False)  # pgvector native type
+    embedding = Column(EmbeddingVector(768), nullable=False)  # pgvector native type
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -72,3 +145,28 @@ class NewsEmbedding(Base):
 
     def __repr__(self):
         return f"<NewsEmbedding(id={self.id}, news_id={self.news_id}, category={self.category})>"
+
+
+class EmbeddingCache(Base):
+    """
+    Content-addressed cache of PhoBERT embeddings.
+
+    Re-indexing an article whose title + description did not change reuses
+    the stored vector instead of running the model again.
+
+    Attributes:
+        content_hash: SHA-256 of the embedded text
+        model_name: Model that produced the embedding
+        embedding: 768-dim embedding (same precision as news_embeddings)
+        created_at: Timestamp when the entry was created
+    """
+    __tablename__ = "embedding_cache"
+
+    content_hash = Column(String(64), primary_key=True)
+    model_name = Column(String(100), primary_key=True)
+    embedding = Column(EmbeddingVector(768), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<EmbeddingCache(content_hash={self.content_hash[:12]}, model_name={self.model_name})>"
@@ -7,12 +7,7 @@ CREATE TABLE IF NOT EXISTS news_ai_results
     id              BIGSERIAL PRIMARY KEY,
     news_id         BIGINT NOT NULL UNIQUE, -- Reference to news_items.id in news-service
 
-    -- Audio files stored in MinIO (minimum 2 voices)
-    -- Format: [
-    --   {"voice_id": "Doan", "description": "Giọng nam miền Bắc", "url": "...", "s3_key": "..."},
-    --   {"voice_id": "Ly", "description": "Giọng nữ miền Nam", "url": "...", "s3_key": "..."}
-    -- ]
-    audio_files     JSONB  NOT NULL DEFAULT '[]',
+    -- Audio files stored in MinIO live in news_audio_files (one row per voice)
 
     -- Summaries (moved from news-service)
     summary_short   TEXT,
@@ -24,8 +19,8 @@ CREATE TABLE IF NOT EXISTS news_ai_results
     updated_at      TIMESTAMP       DEFAULT CURRENT_TIMESTAMP
 );
 
--- Indexes for performance
-CREATE INDEX IF NOT EXISTS idx_news_ai_results_news_id ON news_ai_results (news_id);
+-- news_id lookups use the UNIQUE constraint's index; drop the old duplicate
+DROP INDEX IF EXISTS idx_news_ai_results_news_id;
 
 -- Trigger to auto-update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -43,6 +38,48 @@ CREATE TRIGGER update_news_ai_results_updated_at
     FOR EACH ROW
 EXECUTE FUNCTION update_updated_at_column();
 
+-- News Audio Files table - one generated TTS file per (result, voice)
+CREATE TABLE IF NOT EXISTS news_audio_files
+(
+    id                BIGSERIAL PRIMARY KEY,
+    news_ai_result_id BIGINT      NOT NULL REFERENCES news_ai_results (id) ON DELETE CASCADE,
+    voice_id          VARCHAR(50) NOT NULL, -- e.g. "Doan", "Binh"
+    description       TEXT,                 -- e.g. "Giọng nữ miền Nam"
+    url               TEXT,                 -- Public S3 URL
+    s3_key            TEXT,                 -- Object key in the audio bucket
+    filename          VARCHAR(255),
+
+    -- Metadata
+    created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_news_audio_files_result_voice UNIQUE (news_ai_result_id, voice_id)
+);
+
+-- Existing deployments: move the old JSONB audio_files array into news_audio_files
+DO
+$$
+BEGIN
+    IF EXISTS (SELECT 1
+               FROM information_schema.columns
+               WHERE table_name = 'news_ai_results'
+                 AND column_name = 'audio_files') THEN
+        INSERT INTO news_audio_files (news_ai_result_id, voice_id, description, url, s3_key, filename)
+        SELECT r.id,
+               audio ->> 'voice_id',
+               audio ->> 'description',
+               audio ->> 'url',
+               audio ->> 's3_key',
+               audio ->> 'filename'
+        FROM news_ai_results r
+                 CROSS JOIN LATERAL jsonb_array_elements(r.audio_files) AS audio
+        WHERE audio ->> 'voice_id' IS NOT NULL
+        ON CONFLICT (news_ai_result_id, voice_id) DO NOTHING;
+
+        ALTER TABLE news_ai_results DROP COLUMN audio_files;
+    END IF;
+END
+$$;
+
 -- =============================================================================
 -- pgvector extension for embedding storage
 -- =============================================================================
@@ -55,7 +92,7 @@ CREATE TABLE IF NOT EXISTS news_embeddings
     news_id    BIGINT      NOT NULL UNIQUE, -- Reference to news_items.id in news-service
     category   VARCHAR(50) NOT NULL,        -- Cached category for filtering
     title      TEXT        NOT NULL,        -- Cached title for response
-    embedding  VECTOR(768) NOT NULL,        -- PhoBERT CLS token embedding (768 dimensions)
+    embedding  HALFVEC(768) NOT NULL,       -- PhoBERT CLS token embedding (768 dimensions; precision set below)
 
     -- Metadata
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -63,13 +100,11 @@ CREATE TABLE IF NOT EXISTS news_embeddings
 );
 
 -- Indexes for performance
-CREATE INDEX IF NOT EXISTS idx_news_embeddings_news_id ON news_embeddings (news_id);
-CREATE INDEX IF NOT EXISTS idx_news_embeddings_category ON news_embeddings (category);
-
--- IVFFlat index for fast approximate nearest neighbor search
--- Note: This index should be created AFTER inserting initial data for best performance.
--- Run manually after initial batch indexing:
--- CREATE INDEX IF NOT EXISTS idx_news_embeddings_vector ON news_embeddings USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100);
+-- news_id lookups use the UNIQUE constraint's index; the covering category
+-- index lets category-filtered lookups of (news_id, title) skip the heap.
+DROP INDEX IF EXISTS idx_news_embeddings_news_id;
+DROP INDEX IF EXISTS idx_news_embeddings_category;
+CREATE INDEX IF NOT EXISTS idx_news_embeddings_category_incl ON news_embeddings (category) INCLUDE (news_id, title);
 
 -- Reuse the same update trigger for news_embeddings
 CREATE TRIGGER update_news_embeddings_updated_at
@@ -77,3 +112,61 @@ CREATE TRIGGER update_news_embeddings_updated_at
     ON news_embeddings
     FOR EACH ROW
 EXECUTE FUNCTION update_updated_at_column();
+
+-- Embedding cache - content-addressed PhoBERT embeddings (sha256 of embedded text)
+CREATE TABLE IF NOT EXISTS embedding_cache
+(
+    content_hash VARCHAR(64)  NOT NULL, -- SHA-256 of the embedded text
+    model_name   VARCHAR(100) NOT NULL, -- Model that produced the embedding
+    embedding    HALFVEC(768) NOT NULL, -- Same precision as news_embeddings.embedding (set below)
+
+    -- Metadata
+    created_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (content_hash, model_name)
+);
+
+-- =============================================================================
+-- Embedding precision
+-- =============================================================================
+-- Both embedding columns are stored as 'halfvec' (float16, default) or
+-- 'vector' (float32); this must match DB_EMBEDDING_DTYPE. Choose float32 by
+-- applying this file with PGOPTIONS='-c intellinews.embedding_dtype=vector'
+-- (or ALTER DATABASE ... SET intellinews.embedding_dtype = 'vector').
+-- Columns of existing deployments (and of the tables created above) are
+-- converted in place, then the HNSW index is built with the matching
+-- operator class. It is dropped before converting news_embeddings since an
+-- index built for one type cannot survive the column type change.
+DO
+$$
+    DECLARE
+        dtype TEXT := COALESCE(NULLIF(current_setting('intellinews.embedding_dtype', true), ''), 'halfvec');
+        tbl   TEXT;
+    BEGIN
+        IF dtype NOT IN ('halfvec', 'vector') THEN
+            RAISE EXCEPTION 'intellinews.embedding_dtype must be halfvec or vector, got %', dtype;
+        END IF;
+
+        FOREACH tbl IN ARRAY ARRAY ['news_embeddings', 'embedding_cache']
+            LOOP
+                IF EXISTS (SELECT 1
+                           FROM information_schema.columns
+                           WHERE table_name = tbl
+                             AND column_name = 'embedding'
+                             AND udt_name <> dtype) THEN
+                    IF tbl = 'news_embeddings' THEN
+                        DROP INDEX IF EXISTS idx_news_embeddings_hnsw;
+                    END IF;
+                    EXECUTE format('ALTER TABLE %I ALTER COLUMN embedding TYPE %s(768) USING embedding::%s(768)',
+                                   tbl, dtype, dtype);
+                END IF;
+            END LOOP;
+
+        -- HNSW index for approximate nearest neighbor search (cosine distance).
+        -- Unlike IVFFlat it needs no training data, so it can be created up front.
+        -- Category-filtered queries use it together with idx_news_embeddings_category_incl
+        -- via iterative index scans (pgvector >= 0.8, hnsw.iterative_scan).
+        EXECUTE format('CREATE INDEX IF NOT EXISTS idx_news_embeddings_hnsw ON news_embeddings '
+                       'USING hnsw (embedding %s_cosine_ops) WITH (m = 16, ef_construction = 64)', dtype);
+    END
+$$;
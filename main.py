@@ -2,14 +2,17 @@
 IntelliNews AI Service - FastAPI Application
 TTS, Recommendation, and Summarization services
 """
+import asyncio
 import logging
 import warnings
+from contextlib import asynccontextmanager
 
 # Suppress HuggingFace Hub deprecation warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="huggingface_hub")
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from config import settings
 from api.routes import api_router
@@ -22,19 +25,89 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+def prewarm_models():
+    """Load every model and run one warm-up inference before serving traffic."""
+    from services.recommendation import recommendation_service
+    from services.summarization import news_summarization_service
+    from services.tts import tts_service
+
+    for name, warmup in (
+        ("Recommendation", recommendation_service.warmup),
+        ("Summarization", news_summarization_service.warmup),
+        ("TTS", tts_service.warmup),
+    ):
+        try:
+            warmup()
+        except Exception as e:
+            logger.warning(f"{name} warm-up skipped: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan: initialize shared resources once, in order, on
+    startup and release them in reverse on shutdown.
+    """
+    from db.database import async_engine, engine, init_db
+    from services import cache
+    from services.news_client import news_client
+    from services.tts.storage import tts_storage
+
+    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
+    logger.info(f"Debug mode: {settings.debug}")
+    logger.info(f"API prefix: {settings.api_prefix}")
+    
+    # Initialize database tables (optional - can use migrations instead)
+    try:
+        init_db()
+    except Exception as e:
+        logger.warning(f"Database initialization skipped: {e}")
+
+    # Shared keep-alive pool for news-service calls
+    news_client.start()
+    app.state.news_client = news_client
+
+    # Build (and cache) the OpenAPI schema now rather than on the first /docs hit
+    app.openapi()
+
+    # Avoid cold-start latency on the first model-backed request
+    if settings.prewarm_models:
+        await asyncio.to_thread(prewarm_models)
+
+    yield
+
+    logger.info("Shutting down IntelliNews AI Service")
+
+    await news_client.close()
+
+    try:
+        await tts_storage.close()
+    except Exception as e:
+        logger.warning(f"S3 client shutdown failed: {e}")
+
+    # Release the shared Redis pool, then the database connection pools
+    await cache.close()
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="AI Service for IntelliNews - TTS, Recommendation, and Summarization",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
+    allow_origins=settings.cors_allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -58,24 +131,3 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Application startup event."""
-    logger.info(f"Starting {settings.app_name} v{settings.app_version}")
-    logger.info(f"Debug mode: {settings.debug}")
-    logger.info(f"API prefix: {settings.api_prefix}")
-    
-    # Initialize database tables (optional - can use migrations instead)
-    try:
-        from db.database import init_db
-        init_db()
-    except Exception as e:
-        logger.warning(f"Database initialization skipped: {e}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Application shutdown event."""
-    logger.info("Shutting down IntelliNews AI Service")
@@ -0,0 +1,44 @@
+"""Shared Redis connection for cross-service response caching."""
+import logging
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[aioredis.Redis] = None
+
+
+async def get_redis() -> Optional[aioredis.Redis]:
+    """
+    Get or create the shared Redis connection (lazy initialization).
+
+    Returns:
+        Redis client, or None if Redis is not reachable (caching disabled)
+    """
+    global _redis
+    if _redis is None:
+        try:
+            _redis = aioredis.from_url(
+                settings.redis_url,
+                decode_responses=False,
+                max_connections=settings.redis_max_connections,
+                health_check_interval=settings.redis_health_check_interval
+            )
+            # Test connection
+            await _redis.ping()
+            logger.info(f"Shared Redis cache connected: {settings.redis_url}")
+        except Exception as e:
+            logger.warning(f"Redis not available, shared cache disabled: {e}")
+            _redis = None
+    return _redis
+
+
+async def close():
+    """Close the shared Redis connection (called on application shutdown)."""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
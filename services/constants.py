@@ -23,3 +23,17 @@ KEY_PRESIGNED_URL = "presigned_url"
 KEY_FILENAME = "filename"
 
 TTS_PREFIX_KEY = "tts:presigned"
+
+# Audio content type by file extension (WAV unless the name says otherwise)
+AUDIO_CONTENT_TYPES = {
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".wav": "audio/wav",
+}
+DEFAULT_AUDIO_CONTENT_TYPE = "audio/wav"
+
+# Recommendations below this cosine similarity are not returned
+MIN_SIMILARITY_SCORE = 0.1
+
+# Short multi-sentence text used to warm up models at startup
+WARMUP_TEXT = "Khởi động mô hình. Đây là câu thứ hai. Đây là câu thứ ba."
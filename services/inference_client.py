@@ -0,0 +1,76 @@
+"""HTTP clients for shared model-inference servers (TEI / OpenAI-compatible)."""
+import logging
+from typing import List, Optional
+
+import httpx
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteEmbeddingClient:
+    """
+    Client for a text-embeddings-inference (TEI) server hosting PhoBERT.
+
+    The server must be started with `--pooling cls` so the returned vectors
+    match the in-process [CLS] embeddings.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[int] = None):
+        self.base_url = (base_url or settings.inference_embedding_url).rstrip("/")
+        self._client = httpx.Client(timeout=timeout or settings.inference_timeout)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: Input texts
+
+        Returns:
+            (n, d) float32 array, one row per text
+
+        Raises:
+            httpx.HTTPStatusError: If the server rejects the request
+        """
+        response = self._client.post(
+            f"{self.base_url}/embed",
+            json={"inputs": texts, "truncate": True, "normalize": False},
+        )
+        response.raise_for_status()
+        return np.asarray(response.json(), dtype=np.float32)
+
+
+class RemoteCompletionClient:
+    """Client for an OpenAI-compatible `/v1/completions` server hosting ViT5."""
+
+    def __init__(
+        self,
+        model_name: str,
+        base_url: Optional[str] = None,
+        timeout: Optional[int] = None
+    ):
+        self.model_name = model_name
+        self.base_url = (base_url or settings.inference_summarization_url).rstrip("/")
+        self._client = httpx.Client(timeout=timeout or settings.inference_timeout)
+
+    def complete(self, prompt: str, max_tokens: int = 256) -> str:
+        """
+        Generate a completion for a prompt.
+
+        Raises:
+            httpx.HTTPStatusError: If the server rejects the request
+        """
+        response = self._client.post(
+            f"{self.base_url}/v1/completions",
+            json={
+                "model": self.model_name,
+                "prompt": prompt,
+                "max_tokens": max_tokens,
+                "temperature": 0,
+            },
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["text"]
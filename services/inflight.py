@@ -0,0 +1,53 @@
+"""Coalescing of concurrent identical requests onto a single in-flight run."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class InflightRequests:
+    """
+    Per-key in-flight future map.
+
+    The first caller for a key runs the work; callers arriving while it is
+    still running await the same result (or exception) instead of repeating
+    it. Keys are released as soon as the run finishes.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `func()` once per key across concurrent callers.
+
+        Args:
+            key: Identity of the request (e.g. a news_id)
+            func: Zero-argument coroutine function doing the actual work
+
+        Returns:
+            The result of the shared run
+        """
+        while (future := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The running caller was cancelled; take over the work
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark as retrieved so a run without waiters does not log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
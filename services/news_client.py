@@ -1,23 +1,63 @@
 """HTTP Client for News Service API."""
+import asyncio
+import hashlib
+import json
 import logging
-from typing import Optional, List
+from functools import lru_cache
+from typing import Dict, Optional, List
 
 import httpx
+import orjson
 
 from config import settings
+from services import cache
+from services.constants import FIELD_CONTENT_PLAIN_TEXT, KEY_CATEGORY, KEY_DESCRIPTION, KEY_TITLE
 
 logger = logging.getLogger(__name__)
 
+# Field sets the AI services request. Only these responses are cached, so
+# invalidate() can name every key of an article instead of scanning Redis.
+_CACHED_FIELD_SETS = (
+    (FIELD_CONTENT_PLAIN_TEXT,),                # summarization, TTS
+    (KEY_TITLE, KEY_DESCRIPTION, KEY_CATEGORY),  # recommendation indexing
+    (KEY_TITLE,),                               # check_news_exists
+)
+_CACHEABLE_FIELDS = frozenset(frozenset(fields) for fields in _CACHED_FIELD_SETS)
+
 
 class NewsServiceClient:
     """
     Client to communicate with News Service API.
     Used to fetch news content for AI processing.
+    
+    Keeps one pooled httpx.AsyncClient for the lifetime of the app so
+    keep-alive connections are reused across requests.
     """
     
-    def __init__(self):
-        self.base_url = settings.news_service_url
-        self.timeout = settings.news_service_timeout
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[int] = None):
+        self.base_url = base_url or settings.news_service_url
+        self.timeout = timeout or settings.news_service_timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get or create the shared AsyncClient (lazy initialization)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_keepalive_connections=100, max_connections=200)
+            )
+        return self._client
+
+    def start(self):
+        """Open the shared AsyncClient up front (called on application startup)."""
+        self._get_client()
+
+    async def close(self):
+        """Close the shared AsyncClient (called on application shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def get_news_content(
         self,
@@ -26,6 +66,9 @@ class NewsServiceClient:
     ) -> dict:
         """
         Get specific fields from a news item.
+
+        Responses for the field sets in `_CACHED_FIELD_SETS` are cached in
+        Redis for news_content_cache_ttl seconds.
         
         Args:
             news_id: ID of the news item
@@ -39,21 +82,109 @@ class NewsServiceClient:
             httpx.HTTPStatusError: If request fails
             httpx.RequestError: If connection fails
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            params = {}
-            if fields:
-                params["fields"] = fields
-            
-            url = f"{self.base_url}/api/v1/internal/content/{news_id}"
-            logger.info(f"Fetching news content from: {url} with fields: {fields}")
-            
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"Successfully fetched content for news_id={news_id}")
-            return data
+        cache_key = None
+        if fields and frozenset(fields) in _CACHEABLE_FIELDS:
+            cache_key = self._content_cache_key(news_id, fields)
+            cached = await self._get_cached(cache_key)
+            if cached is not None:
+                return cached
+
+        params = {}
+        if fields:
+            params["fields"] = fields
+        
+        url = f"/api/v1/internal/content/{news_id}"
+        logger.info("Fetching news content from: %s with fields: %s", url, fields)
+        
+        response = await self._get_client().get(url, params=params)
+        response.raise_for_status()
+        
+        data = response.json()
+        logger.info("Successfully fetched content for news_id=%s", news_id)
+        if cache_key is not None:
+            await self._set_cached(cache_key, data)
+        return data
+
+    @staticmethod
+    def _content_cache_key(news_id: int, fields: Optional[List[str]]) -> str:
+        """Redis key for one (news_id, fields) content response."""
+        digest = hashlib.blake2b(
+            json.dumps(sorted(fields or [])).encode("utf-8"), digest_size=6
+        ).hexdigest()
+        return f"news:{news_id}:{digest}"
+
+    async def _get_cached(self, key: str) -> Optional[dict]:
+        """Read a cached content response, if any."""
+        redis = await cache.get_redis()
+        if redis is None:
+            return None
+        try:
+            data = await redis.get(key)
+            if data:
+                return orjson.loads(data)
+        except Exception as e:
+            logger.warning("News content cache read failed: %s", e)
+        return None
+
+    async def _set_cached(self, key: str, data: dict):
+        """Store a content response for news_content_cache_ttl seconds."""
+        redis = await cache.get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(key, orjson.dumps(data), ex=settings.news_content_cache_ttl)
+        except Exception as e:
+            logger.warning("News content cache write failed: %s", e)
+
+    async def invalidate(self, news_id: int):
+        """Drop every cached content response for a news item in one DELETE."""
+        redis = await cache.get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(*(
+                self._content_cache_key(news_id, list(fields)) for fields in _CACHED_FIELD_SETS
+            ))
+        except Exception as e:
+            logger.warning("News content cache invalidation failed: %s", e)
     
+    async def get_news_contents_bulk(
+        self,
+        news_ids: List[int],
+        fields: Optional[List[str]] = None
+    ) -> Dict[int, dict]:
+        """
+        Get the same fields for many news items concurrently.
+
+        Requests share the keep-alive pool; at most
+        `news_service_max_concurrency` are in flight at once so a large
+        page does not saturate the news-service.
+
+        Args:
+            news_ids: IDs of the news items
+            fields: List of fields to retrieve (see get_news_content)
+
+        Returns:
+            Dict of news_id -> content; items that failed to load are omitted
+        """
+        semaphore = asyncio.Semaphore(settings.news_service_max_concurrency)
+
+        async def fetch(news_id: int) -> dict:
+            async with semaphore:
+                return await self.get_news_content(news_id, fields=fields)
+
+        results = await asyncio.gather(
+            *(fetch(news_id) for news_id in news_ids), return_exceptions=True
+        )
+
+        contents = {}
+        for news_id, result in zip(news_ids, results):
+            if isinstance(result, Exception):
+                logger.warning("Failed to fetch content for news_id=%s: %s", news_id, result)
+            else:
+                contents[news_id] = result
+        return contents
+
     async def check_news_exists(self, news_id: int) -> bool:
         """
         Check if a news item exists.
@@ -84,17 +215,16 @@ class NewsServiceClient:
             Paginated response with lightweight news items
             {content: [{id, title, description, category, publisherId}], totalPages, totalElements, ...}
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            url = f"{self.base_url}/api/v1/internal/news/list"
-            params = {"page": page, "size": size}
-            logger.info(f"Fetching news list for AI: page={page}, size={size}")
-            
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"Fetched {len(data.get('content', []))} items (page {page})")
-            return data
+        url = "/api/v1/internal/news/list"
+        params = {"page": page, "size": size}
+        logger.info("Fetching news list for AI: page=%s, size=%s", page, size)
+        
+        response = await self._get_client().get(url, params=params)
+        response.raise_for_status()
+        
+        data = response.json()
+        logger.info("Fetched %d items (page %s)", len(data.get("content", [])), page)
+        return data
 
     async def get_news_by_category_for_ai(
         self, category: str, page: int = 0, size: int = 50
@@ -110,18 +240,36 @@ class NewsServiceClient:
         Returns:
             Paginated response with lightweight news items filtered by category
         """
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            url = f"{self.base_url}/api/v1/internal/news/category/{category}"
-            params = {"page": page, "size": size}
-            logger.info(f"Fetching news by category '{category}' for AI: page={page}, size={size}")
-            
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            logger.info(f"Fetched {len(data.get('content', []))} items for category '{category}'")
-            return data
+        url = f"/api/v1/internal/news/category/{category}"
+        params = {"page": page, "size": size}
+        logger.info(
+            "Fetching news by category '%s' for AI: page=%s, size=%s", category, page, size
+        )
+        
+        response = await self._get_client().get(url, params=params)
+        response.raise_for_status()
+        
+        data = response.json()
+        logger.info(
+            "Fetched %d items for category '%s'", len(data.get("content", [])), category
+        )
+        return data
+
+
+@lru_cache(maxsize=4)
+def _client_for(base_url: str) -> NewsServiceClient:
+    return NewsServiceClient(base_url=base_url)
+
+
+def get_news_client(base_url: Optional[str] = None) -> NewsServiceClient:
+    """
+    Get the shared client for a news-service base URL.
+
+    At most one client (and one httpx connection pool) exists per URL for
+    the lifetime of the process; usable as a FastAPI dependency.
+    """
+    return _client_for(base_url or settings.news_service_url)
 
 
 # Global client instance
-news_client = NewsServiceClient()
+news_client = get_news_client()
@@ -0,0 +1,132 @@
+"""ONNX Runtime execution of exported transformer models (PhoBERT encoder, ViT5 beam search)."""
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Mapping, Optional
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# onnxruntime is optional; without it models run through torch
+try:
+    import onnxruntime as ort
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+    logger.warning("onnxruntime not installed, ONNX model export settings are ignored")
+
+
+def onnx_enabled(model_dir: str) -> bool:
+    """Whether an ONNX export is configured and can be run."""
+    return bool(model_dir) and HAS_ONNXRUNTIME
+
+
+def _create_session(path: Path, providers: Optional[List[str]] = None) -> "ort.InferenceSession":
+    """InferenceSession with all graph optimizations on the configured providers."""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.onnx_intra_op_threads > 0:
+        options.intra_op_num_threads = settings.onnx_intra_op_threads
+    return ort.InferenceSession(
+        str(path),
+        sess_options=options,
+        providers=providers or settings.onnx_providers.split(",")
+    )
+
+
+@lru_cache(maxsize=None)
+def shared_onnx_encoder(model_dir: str) -> "OnnxEncoder":
+    """One OnnxEncoder session per export directory for the whole process."""
+    return OnnxEncoder(model_dir)
+
+
+class OnnxEncoder:
+    """
+    Encoder-only transformer exported with
+    `optimum-cli export onnx --task feature-extraction <model> <dir>`.
+
+    A dynamically quantized (int8) export can be used by pointing
+    `onnx_model_file` at e.g. `model_quantized.onnx`.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_file: Optional[str] = None,
+        providers: Optional[List[str]] = None
+    ):
+        if not HAS_ONNXRUNTIME:
+            raise RuntimeError("onnxruntime is required for OnnxEncoder")
+        path = Path(model_dir) / (model_file or settings.onnx_model_file)
+        self.session = _create_session(path, providers)
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX encoder {path} ({self.session.get_providers()[0]})")
+
+    def last_hidden_state(self, inputs: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Run the encoder on tokenizer output (return_tensors="np").
+
+        Returns:
+            (batch, seq_len, hidden) float32 array
+        """
+        feed = {
+            name: np.asarray(value, dtype=np.int64)
+            for name, value in inputs.items() if name in self._input_names
+        }
+        return self.session.run(["last_hidden_state"], feed)[0]
+
+    def cls_embeddings(self, inputs: Mapping[str, np.ndarray]) -> np.ndarray:
+        """[CLS] token embeddings, shape (batch, hidden)."""
+        return self.last_hidden_state(inputs)[:, 0, :]
+
+
+class OnnxBeamSearch:
+    """
+    Encoder-decoder model (e.g. ViT5) exported together with ONNX Runtime's
+    fused BeamSearch operator, via
+    `python -m onnxruntime.transformers.convert_generation -m <model>
+    --model_type t5 --output <file> --no_repeat_ngram_size 3 --early_stopping`.
+
+    The whole decoding loop (beam reordering, past key/values, n-gram
+    blocking) runs inside one session call instead of one Python step per
+    generated token.
+    """
+
+    def __init__(self, model_path: str, providers: Optional[List[str]] = None):
+        if not HAS_ONNXRUNTIME:
+            raise RuntimeError("onnxruntime is required for OnnxBeamSearch")
+        self.session = _create_session(Path(model_path), providers)
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX beam search model {model_path} ({self.session.get_providers()[0]})")
+
+    def generate(
+        self,
+        inputs: Mapping[str, np.ndarray],
+        max_length: int,
+        min_length: int,
+        num_beams: int,
+        length_penalty: float = 1.0,
+        repetition_penalty: float = 1.0
+    ) -> np.ndarray:
+        """
+        Beam-search decode tokenizer output (return_tensors="np").
+
+        Returns:
+            (batch, max_length) int32 array of the best sequence per input
+        """
+        feed = {
+            "input_ids": np.asarray(inputs["input_ids"], dtype=np.int32),
+            "max_length": np.array([max_length], dtype=np.int32),
+            "min_length": np.array([min_length], dtype=np.int32),
+            "num_beams": np.array([num_beams], dtype=np.int32),
+            "num_return_sequences": np.array([1], dtype=np.int32),
+            "length_penalty": np.array([length_penalty], dtype=np.float32),
+            "repetition_penalty": np.array([repetition_penalty], dtype=np.float32),
+        }
+        if "attention_mask" in self._input_names and "attention_mask" in inputs:
+            feed["attention_mask"] = np.asarray(inputs["attention_mask"], dtype=np.int32)
+        sequences = self.session.run(["sequences"], feed)[0]
+        return sequences[:, 0, :]
@@ -2,28 +2,48 @@
 Content-Based Recommendation Service for IntelliNews.
 
 Uses PhoBERT embeddings to find similar news articles based on
-title + description text. Embeddings are stored in PostgreSQL
-and recommendation results are cached in Redis.
+title + description text. Embeddings are stored in PostgreSQL and
+searched there through pgvector's HNSW index; recommendation
+results are cached in Redis.
 """
+import asyncio
+import hashlib
 import logging
-import json
-from typing import List, Optional, Tuple
+import time
+from collections import Counter, OrderedDict
+from itertools import takewhile
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
+import orjson
+from cachetools import LRUCache
 import torch
-from transformers import AutoTokenizer, AutoModel
-from sklearn.metrics.pairwise import cosine_similarity
-from sqlalchemy.orm import Session
+from transformers import AutoModel
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 
 from config import settings
-from db.database import SessionLocal
-from db.models import NewsEmbedding
+from db.database import AsyncSessionLocal
+from db.models import EmbeddingCache, NewsEmbedding
+from services import cache
+from services.inference_client import RemoteEmbeddingClient
+from services.inflight import InflightRequests
 from services.news_client import news_client
+from services.onnx_encoder import OnnxEncoder, onnx_enabled, shared_onnx_encoder
+from services.torch_runtime import shared_model, shared_tokenizer, to_device
 from .models import RecommendedNewsItem
-from ..constants import KEY_TITLE, KEY_DESCRIPTION, KEY_CONTENT, KEY_ID, KEY_CATEGORY
+from .similarity import l2_normalize, to_float32
+from ..constants import (
+    KEY_TITLE, KEY_DESCRIPTION, KEY_CONTENT, KEY_ID, KEY_CATEGORY, MIN_SIMILARITY_SCORE, WARMUP_TEXT
+)
 
 logger = logging.getLogger(__name__)
 
+# Rows per multi-row INSERT when bulk-storing embeddings
+EMBEDDING_UPSERT_CHUNK = 200
+
 
 class ContentRecommendationService:
     """
@@ -32,44 +52,74 @@ class ContentRecommendationService:
     Flow:
     1. Index: For each article, generate a 768-dim PhoBERT [CLS] embedding 
        from title + description, store in PostgreSQL.
-    2. Recommend: Given a news_id, load its embedding, compute cosine similarity
-       against all embeddings (optionally filtered by category), return top-K.
+    2. Recommend: Given a news_id, load its embedding and rank the top-K
+       (optionally within one category) in PostgreSQL via pgvector's HNSW
+       index, so every worker sees every indexed article.
     3. Cache: Cache recommendation results in Redis with configurable TTL.
     """
 
     def __init__(self, model_name: str = None, device: str = None):
         self.model_name = model_name or settings.phobert_model_name
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self._redis = None
         self._model = None
         self._tokenizer = None
+        self._onnx: Optional[OnnxEncoder] = None
+        self._remote_encoder = RemoteEmbeddingClient() if settings.inference_embedding_url else None
+        # Concurrent cache misses for the same recommendation key share one search
+        self._inflight = InflightRequests()
+        # SHA-256 of text -> float32 vector (~3 KB each, vs ~25 KB as a float list)
+        self._embedding_lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # news_id -> category seen on news list pages, for single-article indexing
+        self._article_categories: LRUCache = LRUCache(
+            maxsize=settings.recommendation_category_cache_size
+        )
+        # category -> stored embeddings, so /stats never runs COUNT(*) per request
+        self._category_counts: Optional[Counter] = None
+        self._counts_loaded_at = 0.0
         logger.info(f"ContentRecommendationService initialized (model will be lazy-loaded)")
 
     def _ensure_model_loaded(self):
         """Lazy-load PhoBERT model (reuses same model as summarizer if already in memory)."""
-        if self._model is None:
+        if self._tokenizer is not None or self._remote_encoder is not None:
+            return
+        if onnx_enabled(settings.phobert_onnx_dir):
+            logger.info(f"Loading PhoBERT ONNX export from {settings.phobert_onnx_dir}")
+            self._onnx = shared_onnx_encoder(settings.phobert_onnx_dir)
+            self._tokenizer = shared_tokenizer(settings.phobert_onnx_dir)
+        else:
             logger.info(f"Loading PhoBERT model: {self.model_name} on {self.device}")
-            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self._model = AutoModel.from_pretrained(self.model_name).to(self.device)
-            self._model.eval()
-            logger.info("PhoBERT model loaded for recommendation service")
-
-    async def _get_redis(self):
-        """Get or create Redis connection (lazy initialization)."""
-        if self._redis is None:
-            try:
-                import redis.asyncio as aioredis
-                self._redis = aioredis.from_url(
-                    settings.redis_url,
-                    decode_responses=False
-                )
-                # Test connection
-                await self._redis.ping()
-                logger.info(f"Redis connected: {settings.redis_url}")
-            except Exception as e:
-                logger.warning(f"Redis not available, caching disabled: {e}")
-                self._redis = None
-        return self._redis
+            self._model = shared_model(AutoModel, self.model_name, self.device, compile=True)
+            self._tokenizer = shared_tokenizer(self.model_name)
+        logger.info("PhoBERT model loaded for recommendation service")
+
+    async def _ensure_counts_loaded(self) -> Counter:
+        """
+        Hydrate per-category embedding counts with one GROUP BY query.
+
+        Counts are bumped in-process on every insert and re-read from
+        PostgreSQL every `recommendation_stats_ttl` seconds to pick up
+        rows written by other workers.
+        """
+        expired = time.monotonic() - self._counts_loaded_at > settings.recommendation_stats_ttl
+        if self._category_counts is None or expired:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(
+                    select(NewsEmbedding.category, func.count(NewsEmbedding.id))
+                    .group_by(NewsEmbedding.category)
+                )).all()
+            self._category_counts = Counter({cat: count for cat, count in rows})
+            self._counts_loaded_at = time.monotonic()
+        return self._category_counts
+
+    def _count_indexed(self, category: str, count: int = 1):
+        """Record newly stored embeddings in the cached counters."""
+        if self._category_counts is not None:
+            self._category_counts[category] += count
+
+    def warmup(self):
+        """Load PhoBERT and run one forward pass ahead of the first request."""
+        self.generate_embedding(WARMUP_TEXT)
+        logger.info("Recommendation model warmed up")
 
     def generate_embedding(self, text: str) -> np.ndarray:
         """
@@ -79,49 +129,190 @@ class ContentRecommendationService:
             text: Input Vietnamese text (typically title + description)
             
         Returns:
-            768-dim numpy array
+            Unit-length 768-dim float32 embedding (bound by pgvector as-is;
+            shared with the LRU, so do not modify it in place)
         """
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        vector = self._lru_get(key)
+        if vector is None:
+            self._ensure_model_loaded()
+            vector = l2_normalize(self._encode([text])[0])
+            self._lru_put({key: vector})
+        return vector
+
+    def _lru_get(self, key: str) -> Optional[np.ndarray]:
+        """Look up an embedding in the in-process LRU, marking it recently used."""
+        vector = self._embedding_lru.get(key)
+        if vector is not None:
+            self._embedding_lru.move_to_end(key)
+        return vector
+
+    def _lru_put(self, vectors: Dict[str, np.ndarray]):
+        """Add embeddings to the in-process LRU, evicting the oldest entries."""
+        for key, vector in vectors.items():
+            self._embedding_lru[key] = np.asarray(vector, dtype=np.float32)
+            self._embedding_lru.move_to_end(key)
+        while len(self._embedding_lru) > settings.recommendation_embedding_cache_size:
+            self._embedding_lru.popitem(last=False)
+
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate PhoBERT [CLS] embeddings for many texts.
+
+        Texts are sorted by token length and grouped so that each forward pass
+        stays under `recommendation_max_batch_tokens` padded tokens and
+        `phobert_batch_size` texts, which keeps padding waste low on
+        mixed-length pages and bounds memory use.
+
+        Args:
+            texts: Input Vietnamese texts
+
+        Returns:
+            (len(texts), 768) float32 array of unit-length embeddings, in the
+            same order as `texts`
+        """
+        if not texts:
+            return np.empty((0, 768), dtype=np.float32)
         self._ensure_model_loaded()
 
-        inputs = self._tokenizer(
-            text,
-            return_tensors="pt",
+        if self._remote_encoder is not None:
+            # The inference server does its own dynamic batching
+            return l2_normalize(self._remote_encoder.embed(texts))
+
+        # Tokenize once; batches are padded from these ids below
+        encoded = self._tokenizer(texts, truncation=True, max_length=256)
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+        budget = settings.recommendation_max_batch_tokens
+
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        batches = []
+        batch = []
+        for i in order:
+            # Sorted ascending, so the current text is the longest in the batch
+            if batch and (
+                lengths[i] * (len(batch) + 1) > budget
+                or len(batch) >= settings.phobert_batch_size
+            ):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+
+        for batch in batches:
+            inputs = self._tokenizer.pad(
+                {key: [encoded[key][i] for i in batch] for key in encoded.keys()},
+                return_tensors=self._tensor_type
+            )
+            for i, vector in zip(batch, self._forward(inputs)):
+                embeddings[i] = vector
+
+        logger.info(f"Embedded {len(texts)} texts in {len(batches)} forward passes")
+        return l2_normalize(np.stack(embeddings))
+
+    async def _cached_embeddings(self, db: AsyncSession, texts: List[str]) -> List[np.ndarray]:
+        """
+        Embeddings for `texts`, keyed by SHA-256 of the text.
+
+        Looks in the in-process LRU first, then the embedding_cache table;
+        only texts missing from both are sent to PhoBERT (in a worker thread).
+        New vectors are written to embedding_cache in the caller's transaction.
+        """
+        keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        found = {}
+
+        for key in set(keys):
+            vector = self._lru_get(key)
+            if vector is not None:
+                found[key] = vector
+
+        missing = [key for key in set(keys) if key not in found]
+        if missing:
+            rows = (await db.execute(
+                select(EmbeddingCache.content_hash, EmbeddingCache.embedding).where(
+                    EmbeddingCache.model_name == self.model_name,
+                    EmbeddingCache.content_hash.in_(missing)
+                )
+            )).all()
+            for row in rows:
+                found[row.content_hash] = to_float32(row.embedding)
+
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                to_embed.setdefault(key, text)
+
+        if to_embed:
+            vectors = await asyncio.to_thread(self.generate_embeddings, list(to_embed.values()))
+            generated = dict(zip(to_embed, vectors))
+            await db.execute(
+                pg_insert(EmbeddingCache).values([
+                    {"content_hash": key, "model_name": self.model_name, "embedding": vector}
+                    for key, vector in generated.items()
+                ]).on_conflict_do_nothing()
+            )
+            found.update(generated)
+
+        logger.info(f"Embedding cache: {len(texts) - len(to_embed)}/{len(texts)} hits")
+
+        self._lru_put(found)
+        return [found[key] for key in keys]
+
+    @property
+    def _tensor_type(self) -> str:
+        """Tokenizer tensor type expected by the loaded backend."""
+        return "np" if self._onnx is not None else "pt"
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Run one PhoBERT forward pass and return the [CLS] embeddings."""
+        if self._remote_encoder is not None:
+            return self._remote_encoder.embed(texts)
+
+        return self._forward(self._tokenizer(
+            texts,
+            return_tensors=self._tensor_type,
             padding=True,
             truncation=True,
             max_length=256
-        ).to(self.device)
+        ))
+
+    def _forward(self, inputs) -> np.ndarray:
+        """Run one forward pass on tokenizer output and return [CLS] embeddings."""
+        if self._onnx is not None:
+            return self._onnx.cls_embeddings(inputs)
 
-        with torch.no_grad():
-            outputs = self._model(**inputs)
+        with torch.inference_mode():
+            outputs = self._model(**to_device(inputs, self.device))
 
-        # Use [CLS] token embedding, convert to list for pgvector
-        embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()[0]
-        return embedding.tolist()
+        # Use [CLS] token embedding
+        return outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
 
-    async def index_article(self, news_id: int) -> bool:
+    async def index_article(self, news_id: int, db: AsyncSession) -> bool:
         """
         Generate and store embedding for a single article.
         
         Args:
             news_id: News item ID to index
+            db: Database session (request-scoped)
             
         Returns:
             True if indexed successfully, False if skipped (already exists)
         """
-        db: Session = SessionLocal()
         try:
             # Check if already indexed
-            existing = db.query(NewsEmbedding).filter(
-                NewsEmbedding.news_id == news_id
-            ).first()
+            existing = (await db.execute(
+                select(NewsEmbedding.id).where(NewsEmbedding.news_id == news_id)
+            )).first()
             if existing:
                 logger.info(f"Article {news_id} already indexed, skipping")
                 return False
 
-            # Fetch article content from backend
             content = await news_client.get_news_content(
-                news_id, fields=[KEY_TITLE, KEY_DESCRIPTION]
+                news_id, fields=[KEY_TITLE, KEY_DESCRIPTION, KEY_CATEGORY]
             )
+            # Older news-service builds ignore the category field
+            category = content.get(KEY_CATEGORY) or await self._get_article_category(news_id)
 
             title = content.get(KEY_TITLE, "")
             description = content.get(KEY_DESCRIPTION, "")
@@ -133,24 +324,20 @@ class ContentRecommendationService:
             # Combine title + description for embedding
             text = f"{title} {description}" if description else title
 
-            # Generate embedding
-            embedding = self.generate_embedding(text)
-
-            # We need category info — fetch from the AI list endpoint
-            # For single article, we can get it from the content endpoint
-            # But the current internal API doesn't return category
-            # So we fetch from the list endpoint by searching
-            category = await self._get_article_category(news_id)
-
-            # Store in database (pgvector handles list→vector conversion)
-            news_embedding = NewsEmbedding(
-                news_id=news_id,
-                category=category or "UNKNOWN",
-                title=title,
-                embedding=embedding
-            )
-            db.add(news_embedding)
-            db.commit()
+            # Generate embedding (reused if this exact text was embedded before)
+            embedding = (await self._cached_embeddings(db, [text]))[0]
+
+            # Store in database (pgvector binds the ndarray directly); the
+            # upsert also absorbs a concurrent index of the same article
+            category = category or "UNKNOWN"
+            await self._bulk_upsert_embeddings(db, [{
+                "news_id": news_id,
+                "category": category,
+                "title": title,
+                "embedding": embedding,
+            }])
+            await db.commit()
+            self._count_indexed(category)
 
             # Invalidate cache for this category
             await self._invalidate_cache(category)
@@ -159,26 +346,34 @@ class ContentRecommendationService:
             return True
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Failed to index article {news_id}: {e}")
             raise
-        finally:
-            db.close()
 
     async def _get_article_category(self, news_id: int) -> Optional[str]:
-        """Try to fetch article category from backend."""
-        try:
-            # Search through news list to find the category
-            data = await news_client.get_news_list_for_ai(page=0, size=200)
-            for item in data.get(KEY_CONTENT, []):
-                if item.get(KEY_ID) == news_id:
-                    return item.get(KEY_CATEGORY, "UNKNOWN")
-        except Exception as e:
-            logger.warning(f"Could not fetch category for news_id={news_id}: {e}")
-        return "UNKNOWN"
+        """
+        Category of an article whose content response did not include it.
+
+        Served from categories remembered off news list pages; on a miss the
+        latest page is fetched once and remembered as a whole.
+        """
+        if news_id not in self._article_categories:
+            try:
+                data = await news_client.get_news_list_for_ai(page=0, size=200)
+                self._remember_categories(data.get(KEY_CONTENT, []))
+            except Exception as e:
+                logger.warning(f"Could not fetch category for news_id={news_id}: {e}")
+        return self._article_categories.get(news_id, "UNKNOWN")
+
+    def _remember_categories(self, articles: List[dict]):
+        """Record the categories of news list items for later single-article indexing."""
+        for item in articles:
+            if item.get(KEY_CATEGORY):
+                self._article_categories[item[KEY_ID]] = item[KEY_CATEGORY]
 
     async def index_articles_batch(
             self,
+            db: AsyncSession,
             page: int = 0,
             size: int = 50,
             category: Optional[str] = None
@@ -190,6 +385,7 @@ class ContentRecommendationService:
             page: Page number (0-indexed)
             size: Number of articles per batch
             category: Optional category filter
+            db: Database session (request-scoped)
             
         Returns:
             Tuple of (indexed_count, skipped_count)
@@ -205,20 +401,21 @@ class ContentRecommendationService:
         if not articles:
             logger.info("No articles to index")
             return 0, 0
+        self._remember_categories(articles)
 
         indexed = 0
         skipped = 0
-        db: Session = SessionLocal()
 
         try:
             # Get already-indexed news_ids
             existing_ids = set()
             article_ids = [a[KEY_ID] for a in articles]
-            existing_records = db.query(NewsEmbedding.news_id).filter(
-                NewsEmbedding.news_id.in_(article_ids)
-            ).all()
+            existing_records = (await db.execute(
+                select(NewsEmbedding.news_id).where(NewsEmbedding.news_id.in_(article_ids))
+            )).all()
             existing_ids = {r.news_id for r in existing_records}
 
+            pending = []
             for article in articles:
                 news_id = article[KEY_ID]
 
@@ -236,35 +433,59 @@ class ContentRecommendationService:
 
                 # Combine title + description
                 text = f"{title} {description}" if description else title
-
-                # Generate embedding
-                embedding = self.generate_embedding(text)
-
-                # Store in database (pgvector handles list→vector conversion)
-                news_embedding = NewsEmbedding(
-                    news_id=news_id,
-                    category=art_category,
-                    title=title,
-                    embedding=embedding
-                )
-                db.add(news_embedding)
+                pending.append((news_id, art_category, title, text))
+
+            # Generate embeddings for the whole page in token-budgeted batches
+            embeddings = await self._cached_embeddings(db, [text for *_, text in pending])
+
+            rows = []
+            for (news_id, art_category, title, _), embedding in zip(pending, embeddings):
+                rows.append({
+                    "news_id": news_id,
+                    "category": art_category,
+                    "title": title,
+                    "embedding": embedding,
+                })
                 indexed += 1
 
-            db.commit()
+            # Store in database with one multi-row INSERT per chunk
+            await self._bulk_upsert_embeddings(db, rows)
+            await db.commit()
+            for art_category, count in Counter(c for _, c, *_ in pending).items():
+                self._count_indexed(art_category, count)
+
             logger.info(f"Batch indexing complete: {indexed} indexed, {skipped} skipped")
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Batch indexing failed: {e}")
             raise
-        finally:
-            db.close()
 
         return indexed, skipped
 
+    async def _bulk_upsert_embeddings(self, db: AsyncSession, rows: List[dict]):
+        """
+        Insert NewsEmbedding rows as multi-row INSERTs, updating on news_id conflict.
+
+        Rows are sent in chunks of `EMBEDDING_UPSERT_CHUNK` to stay well under
+        PostgreSQL's bind-parameter limit.
+        """
+        for start in range(0, len(rows), EMBEDDING_UPSERT_CHUNK):
+            stmt = pg_insert(NewsEmbedding).values(rows[start:start + EMBEDDING_UPSERT_CHUNK])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[NewsEmbedding.news_id],
+                set_={
+                    "category": stmt.excluded.category,
+                    "title": stmt.excluded.title,
+                    "embedding": stmt.excluded.embedding,
+                    "updated_at": func.now(),
+                }
+            ))
+
     async def get_similar_articles(
             self,
             news_id: int,
+            db: AsyncSession,
             limit: int = 10,
             category_filter: Optional[str] = None
     ) -> Tuple[List[RecommendedNewsItem], bool]:
@@ -275,6 +496,7 @@ class ContentRecommendationService:
             news_id: Source article ID
             limit: Number of similar articles to return
             category_filter: Optional category to filter results
+            db: Database session (request-scoped; no connection is taken on a cache hit)
             
         Returns:
             Tuple of (list of RecommendedNewsItem, is_cached)
@@ -286,137 +508,173 @@ class ContentRecommendationService:
             logger.info(f"Cache hit for {cache_key}")
             return cached_result, True
 
-        db: Session = SessionLocal()
+        # Concurrent misses for the same key share one search
+        recommendations = await self._inflight.run(
+            cache_key, lambda: self._find_similar(cache_key, news_id, db, limit, category_filter)
+        )
+        return recommendations, False
+
+    async def _find_similar(
+            self,
+            cache_key: str,
+            news_id: int,
+            db: AsyncSession,
+            limit: int,
+            category_filter: Optional[str]
+    ) -> List[RecommendedNewsItem]:
+        """Search for similar articles and cache the result under `cache_key`."""
         try:
             # Get source article embedding
-            source = db.query(NewsEmbedding).filter(
-                NewsEmbedding.news_id == news_id
-            ).first()
+            source = (await db.execute(
+                select(NewsEmbedding).where(NewsEmbedding.news_id == news_id)
+            )).scalar_one_or_none()
 
             if not source:
                 logger.warning(f"No embedding found for news_id={news_id}")
-                return [], False
-
-            source_embedding = np.array(source.embedding)
-
-            # Load candidate embeddings (optionally filtered by category)
-            query = db.query(NewsEmbedding).filter(
-                NewsEmbedding.news_id != news_id
-            )
-            if category_filter:
-                query = query.filter(NewsEmbedding.category == category_filter)
-
-            candidates = query.all()
-
-            if not candidates:
-                logger.info(f"No candidates found for similarity search")
-                return [], False
-
-            # Compute cosine similarity (pgvector returns lists, convert to numpy)
-            candidate_embeddings = np.array([
-                c.embedding for c in candidates
-            ])
+                return []
 
-            similarities = cosine_similarity(
-                source_embedding.reshape(1, -1),
-                candidate_embeddings
-            )[0]
+            scored = await self._search_database(db, source, limit, category_filter)
 
-            # Get top-K indices
-            top_k = min(limit, len(similarities))
-            top_indices = np.argsort(similarities)[::-1][:top_k]
-
-            # Build response
-            recommendations = []
-            for idx in top_indices:
-                candidate = candidates[idx]
-                score = float(similarities[idx])
-
-                # Skip very low similarity scores  
-                if score < 0.1:
-                    continue
-
-                recommendations.append(RecommendedNewsItem(
+            # Candidates arrive sorted by similarity, so stop at the first
+            # score below the threshold instead of scanning the rest
+            recommendations = [
+                RecommendedNewsItem(
                     news_id=candidate.news_id,
                     title=candidate.title,
                     category=candidate.category,
                     similarity_score=round(score, 4)
-                ))
+                )
+                for candidate, score in takewhile(
+                    lambda pair: pair[1] >= MIN_SIMILARITY_SCORE, scored
+                )
+            ]
 
             # Cache the result in Redis
-            await self._set_to_cache(cache_key, recommendations)
+            await self._set_to_cache(cache_key, recommendations, category_filter)
 
             logger.info(
                 f"Generated {len(recommendations)} recommendations for news_id={news_id}"
             )
-            return recommendations, False
+            return recommendations
 
         except Exception as e:
             logger.error(f"Similarity search failed for news_id={news_id}: {e}")
             raise
-        finally:
-            db.close()
+
+    async def _search_database(
+            self,
+            db: AsyncSession,
+            source: NewsEmbedding,
+            limit: int,
+            category_filter: Optional[str] = None
+    ) -> List[Tuple[NewsEmbedding, float]]:
+        """
+        Top-K candidates ranked inside PostgreSQL by the pgvector HNSW index.
+
+        The optional category predicate and `embedding <=> query` ordering run
+        in the same query, so only the final `limit` rows leave the database.
+        With a filter, iterative scans keep fetching until enough rows pass
+        it instead of returning a short list.
+        """
+        # SET does not take bind parameters; the value is an int from settings
+        await db.execute(text(f"SET LOCAL hnsw.ef_search = {int(settings.hnsw_ef_search)}"))
+        if category_filter:
+            await db.execute(text("SET LOCAL hnsw.iterative_scan = strict_order"))
+
+        distance = NewsEmbedding.embedding.cosine_distance(
+            to_float32(source.embedding)
+        ).label("distance")
+        query = select(NewsEmbedding, distance).options(
+            defer(NewsEmbedding.embedding)
+        ).where(NewsEmbedding.news_id != source.news_id)
+        if category_filter:
+            query = query.where(NewsEmbedding.category == category_filter)
+        rows = (await db.execute(query.order_by(distance).limit(limit))).all()
+
+        if not rows:
+            logger.info("No candidates found for similarity search")
+        return [(row, 1.0 - float(dist)) for row, dist in rows]
 
     async def _get_from_cache(self, key: str) -> Optional[List[RecommendedNewsItem]]:
         """Get recommendation results from Redis cache."""
-        redis = await self._get_redis()
+        redis = await cache.get_redis()
         if redis is None:
             return None
         try:
             data = await redis.get(key)
             if data:
-                items_data = json.loads(data)
-                return [RecommendedNewsItem(**item) for item in items_data]
+                # Written by _set_to_cache from validated models; skip re-validation
+                return [RecommendedNewsItem.model_construct(**item) for item in orjson.loads(data)]
         except Exception as e:
             logger.warning(f"Cache read failed: {e}")
         return None
 
-    async def _set_to_cache(self, key: str, items: List[RecommendedNewsItem]):
-        """Store recommendation results in Redis cache."""
-        redis = await self._get_redis()
+    @staticmethod
+    def _cache_tag(category_filter: Optional[str]) -> str:
+        """Redis set listing the cached results for one category filter."""
+        return f"rec_index:{category_filter or 'all'}"
+
+    async def _set_to_cache(
+            self,
+            key: str,
+            items: List[RecommendedNewsItem],
+            category_filter: Optional[str] = None
+    ):
+        """Store recommendation results in Redis cache, tagged by category filter."""
+        redis = await cache.get_redis()
         if redis is None:
             return
         try:
-            data = json.dumps([item.model_dump() for item in items])
-            await redis.set(key, data, ex=settings.recommendation_cache_ttl)
+            data = orjson.dumps([item.model_dump() for item in items])
+            tag = self._cache_tag(category_filter)
+            ttl = settings.recommendation_cache_ttl
+            # The tag set expires with its newest entry, so it never outlives the keys
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, data, ex=ttl)
+                pipe.sadd(tag, key)
+                pipe.expire(tag, ttl)
+                await pipe.execute()
             logger.debug(f"Cached {len(items)} items with key={key}")
         except Exception as e:
             logger.warning(f"Cache write failed: {e}")
 
     async def _invalidate_cache(self, category: Optional[str] = None):
-        """Invalidate recommendation cache (when new articles are indexed)."""
-        redis = await self._get_redis()
+        """
+        Invalidate recommendation cache (when new articles are indexed).
+
+        A new article in `category` can change unfiltered results and results
+        filtered to that category; results filtered to other categories stay.
+        Without a category every cached result is dropped.
+        """
+        redis = await cache.get_redis()
         if redis is None:
             return
         try:
-            # Invalidate all recommendation keys (simple approach)
-            # In production, you'd use a more targeted pattern
-            pattern = "rec:*"
-            async for key in redis.scan_iter(match=pattern, count=100):
-                await redis.delete(key)
-            logger.debug("Recommendation cache invalidated")
+            if category:
+                tags = [self._cache_tag(None), self._cache_tag(category)]
+            else:
+                tags = [tag async for tag in redis.scan_iter(match="rec_index:*", count=100)]
+
+            async with redis.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.smembers(tag)
+                members = await pipe.execute()
+
+                keys = set(tags).union(*members)
+                if keys:
+                    pipe.delete(*keys)
+                    await pipe.execute()
+            logger.debug(f"Recommendation cache invalidated ({len(keys)} keys)")
         except Exception as e:
             logger.warning(f"Cache invalidation failed: {e}")
 
-    def get_embedding_stats(self) -> dict:
-        """Get statistics about stored embeddings."""
-        db: Session = SessionLocal()
-        try:
-            total = db.query(NewsEmbedding).count()
-
-            # Count by category
-            from sqlalchemy import func
-            category_counts = db.query(
-                NewsEmbedding.category,
-                func.count(NewsEmbedding.id)
-            ).group_by(NewsEmbedding.category).all()
-
-            return {
-                "total_embeddings": total,
-                "by_category": {cat: count for cat, count in category_counts}
-            }
-        finally:
-            db.close()
+    async def get_embedding_stats(self) -> dict:
+        """Get statistics about stored embeddings (served from cached counters)."""
+        category_counts = await self._ensure_counts_loaded()
+        return {
+            "total_embeddings": sum(category_counts.values()),
+            "by_category": dict(category_counts)
+        }
 
 
 # Global service instance (lazy-loaded)
@@ -0,0 +1,24 @@
+"""Vector helpers for news embeddings."""
+import numpy as np
+
+
+def to_float32(embedding) -> np.ndarray:
+    """
+    A pgvector column value (ndarray for `vector`, HalfVector for `halfvec`)
+    or plain sequence as a float32 vector.
+    """
+    if hasattr(embedding, "to_numpy"):
+        embedding = embedding.to_numpy()
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors (a (d,) vector or (n, d) rows) to unit length, so cosine
+    similarity reduces to a dot product. Zero vectors are left as they are.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
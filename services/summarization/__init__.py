@@ -1,7 +1,7 @@
 """Summarization package for IntelliNews AI Service."""
 from .base_summarizer import BaseSummarizer
 from .phobert_summarizer import PhoBERTSummarizer
-from .vit5_summarizer import ViT5Summarizer
+from .vit5_summarizer import ViT5Summarizer, RemoteViT5Summarizer
 from .position_summarizer import PositionSummarizer
 from .news_summarization_service import NewsSummarizationService, news_summarization_service
 from .models import NewsSummarizationResponse
@@ -10,6 +10,7 @@ __all__ = [
     "BaseSummarizer",
     "PhoBERTSummarizer",
     "ViT5Summarizer",
+    "RemoteViT5Summarizer",
     "PositionSummarizer",
     "NewsSummarizationService",
     "news_summarization_service",
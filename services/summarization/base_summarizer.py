@@ -2,31 +2,39 @@
 import re
 import logging
 from abc import ABC, abstractmethod
+from typing import Any
+
+from config import settings
 
 
 logger = logging.getLogger(__name__)
 
 # Try to use underthesea for better Vietnamese sentence tokenization
-try:
-    from underthesea import sent_tokenize as _underthesea_sent_tokenize
-    HAS_UNDERTHESEA = True
-except ImportError:
-    HAS_UNDERTHESEA = False
-    logger.warning("underthesea not installed, using regex-based sentence tokenizer")
+# (FAST_SENTENCE_TOKENIZE=true skips it and its model import entirely)
+HAS_UNDERTHESEA = False
+if not settings.fast_sentence_tokenize:
+    try:
+        from underthesea import sent_tokenize as _underthesea_sent_tokenize
+        HAS_UNDERTHESEA = True
+    except ImportError:
+        logger.warning("underthesea not installed, using regex-based sentence tokenizer")
+
+# Compiled once at import instead of looked up on every call
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
 
 
 def clean_text(text: str) -> str:
     """Clean and normalize Vietnamese text."""
-    text = re.sub(r'\s+', ' ', text.strip())
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    text = re.sub(r'\s+', ' ', text.strip())
-    return text
+    # URLs never contain whitespace, so one collapse after removing them suffices
+    return _WHITESPACE_RE.sub(' ', _URL_RE.sub('', text)).strip()
 
 
 def simple_sentence_tokenize(text: str) -> list[str]:
     """Simple regex-based sentence tokenizer for Vietnamese text."""
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    return [s.strip() for s in sentences if s.strip()]
+    sentences = _SENTENCE_SPLIT_RE.split(text)
+    return [s for s in map(str.strip, sentences) if s]
 
 
 def sentence_tokenize(text: str) -> list[str]:
@@ -56,5 +64,28 @@ class BaseSummarizer(ABC):
         """
         raise NotImplementedError("Each summarizer must implement this method")
 
+    def preprocess(self, text: str, ratio: float = 0.3) -> Any:
+        """
+        CPU-only preparation (cleaning, sentence splitting, tokenization).
+
+        Split from `summarize_prepared` so callers can run it on a separate
+        worker pool and overlap it with model inference for other requests.
+        Defaults to passing the text through unchanged.
+        """
+        return text
+
+    def summarize_prepared(self, prepared: Any, ratio: float = 0.3) -> str:
+        """Run the model stage on the output of `preprocess`."""
+        return self.summarize(prepared, ratio)
+
+    @property
+    def cache_tag(self) -> str:
+        """
+        Identity of the model and settings that shape the output, used in
+        summary cache keys so a configuration change is never served
+        summaries produced by the previous one.
+        """
+        return self.name
+
     def __str__(self):
         return self.name
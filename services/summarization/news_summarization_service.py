@@ -1,17 +1,28 @@
 """News Summarization Service - orchestrates summarization for news articles."""
+import asyncio
+import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from cachetools import TTLCache
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload
 
 from config import settings
 from db.models import NewsAIResult
+from services import cache
+from services.inflight import InflightRequests
+from services.onnx_encoder import onnx_enabled
 from services.news_client import news_client
 from services.constants import (
     FIELD_CONTENT_PLAIN_TEXT,
     KEY_NEWS_ID,
     KEY_SUMMARY_SHORT,
     KEY_SUMMARY_DEFAULT,
+    WARMUP_TEXT,
 )
 
 logger = logging.getLogger(__name__)
@@ -21,26 +32,54 @@ _phobert_summarizer = None
 _vit5_summarizer = None
 _position_summarizer = None
 
+# Tokenization runs on its own pool so it overlaps with model inference for
+# other requests; inference is serialized on a single thread so the models
+# never run concurrently with themselves.
+_tokenizer_executor = ThreadPoolExecutor(
+    max_workers=settings.summarization_tokenizer_workers,
+    thread_name_prefix="summarization-tokenize"
+)
+_inference_executor = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix="summarization-inference"
+)
+
 
 def get_phobert_summarizer():
-    """Lazy-load PhoBERT summarizer (heavy model)."""
+    """Lazy-load PhoBERT summarizer (heavy model, or remote if configured)."""
     global _phobert_summarizer
     if _phobert_summarizer is None:
         from .phobert_summarizer import PhoBERTSummarizer
+        encoder = None
+        if settings.inference_embedding_url:
+            from services.inference_client import RemoteEmbeddingClient
+            encoder = RemoteEmbeddingClient()
         _phobert_summarizer = PhoBERTSummarizer(
-            model_name=settings.phobert_model_name
+            model_name=settings.phobert_model_name,
+            encoder=encoder
         )
     return _phobert_summarizer
 
 
 def get_vit5_summarizer():
-    """Lazy-load ViT5 summarizer (heavy model)."""
+    """Lazy-load ViT5 summarizer (heavy model, ONNX or remote if configured)."""
     global _vit5_summarizer
     if _vit5_summarizer is None:
-        from .vit5_summarizer import ViT5Summarizer
-        _vit5_summarizer = ViT5Summarizer(
-            model_name=settings.vit5_model_name
-        )
+        if settings.inference_summarization_url:
+            from .vit5_summarizer import RemoteViT5Summarizer
+            _vit5_summarizer = RemoteViT5Summarizer(
+                model_name=settings.vit5_model_name
+            )
+        elif onnx_enabled(settings.vit5_onnx_model):
+            from .vit5_summarizer import OnnxViT5Summarizer
+            _vit5_summarizer = OnnxViT5Summarizer(
+                model_name=settings.vit5_model_name
+            )
+        else:
+            from .vit5_summarizer import ViT5Summarizer
+            _vit5_summarizer = ViT5Summarizer(
+                model_name=settings.vit5_model_name
+            )
     return _vit5_summarizer
 
 
@@ -60,15 +99,127 @@ class NewsSummarizationService:
     Workflow:
     1. Check DB cache for existing summaries
     2. Fetch content from news-service
-    3. Run ViT5 → summary_short
-    4. Run PhoBERT → summary_default
-    5. Upsert NewsAIResult and return
+    3. Run ViT5 → summary_short and PhoBERT → summary_default concurrently
+    4. Upsert NewsAIResult and return
+    
+    Stored summaries are also kept in a short-lived in-process TTL cache
+    so hot articles skip PostgreSQL on repeated GETs.
     """
 
+    def __init__(self):
+        self._summary_cache: TTLCache = TTLCache(
+            maxsize=settings.response_cache_size,
+            ttl=settings.response_cache_ttl
+        )
+        # Concurrent generate calls for the same news_id share one run
+        self._inflight = InflightRequests()
+
+    def warmup(self):
+        """Load all summarizers and run one summary each ahead of the first request."""
+        get_vit5_summarizer().summarize(WARMUP_TEXT)
+        get_phobert_summarizer().summarize(WARMUP_TEXT)
+        # The fallback path should not pay its import on the first failure either
+        get_position_summarizer().summarize(WARMUP_TEXT)
+        logger.info("Summarization models warmed up")
+
+    @staticmethod
+    def _text_cache_key(summarizer, text: str, ratio: float) -> str:
+        """Redis key for one (summarizer configuration, ratio, article text) summary."""
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"summary:{summarizer.cache_tag}:{ratio}:{digest}"
+
+    async def _get_cached_text_summary(self, key: str) -> Optional[str]:
+        """Read a summary cached by content hash, if any."""
+        redis = await cache.get_redis()
+        if redis is None:
+            return None
+        try:
+            data = await redis.get(key)
+            if data:
+                return data.decode("utf-8")
+        except Exception as e:
+            logger.warning(f"Summary cache read failed: {e}")
+        return None
+
+    async def _set_cached_text_summary(self, key: str, summary: str):
+        """Store a summary for summary_text_cache_ttl seconds."""
+        redis = await cache.get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(key, summary.encode("utf-8"), ex=settings.summary_text_cache_ttl)
+        except Exception as e:
+            logger.warning(f"Summary cache write failed: {e}")
+
+    async def _summarize(
+        self, get_summarizer, text: str, ratio: float = 0.3, refresh: bool = False
+    ) -> str:
+        """
+        Run one summarizer off the event loop as a two-stage pipeline.
+
+        Results are cached in Redis by a hash of the article text and the
+        summarizer configuration, so re-processing an unchanged article
+        (retries, republished items) skips inference.
+
+        Args:
+            get_summarizer: Lazy loader for the summarizer singleton
+            text: Input text
+            ratio: Ratio of sentences to keep (for extractive methods)
+            refresh: Skip the cached copy and overwrite it (forced regeneration)
+
+        Returns:
+            Summary string
+        """
+        loop = asyncio.get_running_loop()
+        summarizer = await loop.run_in_executor(_inference_executor, get_summarizer)
+        cache_key = self._text_cache_key(summarizer, text, ratio)
+        cached = None if refresh else await self._get_cached_text_summary(cache_key)
+        if cached is not None:
+            logger.info(f"Reusing cached {summarizer.name} summary for identical text")
+            return cached
+
+        prepared = await loop.run_in_executor(
+            _tokenizer_executor, summarizer.preprocess, text, ratio
+        )
+        summary = await loop.run_in_executor(
+            _inference_executor, summarizer.summarize_prepared, prepared, ratio
+        )
+        if summary:
+            await self._set_cached_text_summary(cache_key, summary)
+        return summary
+
+    async def _summarize_or_fallback(
+        self,
+        name: str,
+        get_summarizer,
+        text: str,
+        field: str,
+        fallback_ratio: float,
+        refresh: bool = False
+    ) -> str:
+        """Run a model summarizer, falling back to the position-based one on failure."""
+        try:
+            return await self._summarize(get_summarizer, text, refresh=refresh)
+        except Exception as e:
+            logger.error(f"{name} summarization failed: {e}")
+            logger.info(f"Falling back to Position-based summarizer for {field}")
+            return await self._summarize(
+                get_position_summarizer, text, ratio=fallback_ratio, refresh=refresh
+            )
+
+    async def _get_result(self, news_id: int, db: AsyncSession) -> Optional[NewsAIResult]:
+        """Load the NewsAIResult row for a news item, if any."""
+        result = await db.execute(
+            select(NewsAIResult)
+            .options(noload(NewsAIResult.audio_files))
+            .where(NewsAIResult.news_id == news_id)
+        )
+        return result.scalar_one_or_none()
+
     async def get_or_generate_summaries(
         self,
         news_id: int,
-        db: Session,
+        db: AsyncSession,
         force: bool = False
     ) -> tuple[dict, bool]:
         """
@@ -76,7 +227,7 @@ class NewsSummarizationService:
 
         Args:
             news_id: ID of the news item
-            db: Database session
+            db: Async database session
             force: If True, regenerate even if cached
 
         Returns:
@@ -87,9 +238,7 @@ class NewsSummarizationService:
             RuntimeError: If summarization fails
         """
         # 1. Check cache
-        existing = db.query(NewsAIResult).filter(
-            NewsAIResult.news_id == news_id
-        ).first()
+        existing = await self._get_result(news_id, db)
 
         if (
             not force
@@ -104,6 +253,22 @@ class NewsSummarizationService:
                 KEY_SUMMARY_DEFAULT: existing.summary_default,
             }, True
 
+        if force:
+            # Re-summarize the current article text, not a cached copy
+            await news_client.invalidate(news_id)
+
+        # A forced run must not join a normal one that may reuse cached text
+        return await self._inflight.run(
+            (news_id, force), lambda: self._generate_summaries(news_id, db, force)
+        )
+
+    async def _generate_summaries(
+        self,
+        news_id: int,
+        db: AsyncSession,
+        force: bool = False
+    ) -> tuple[dict, bool]:
+        """Fetch content, run both summarizers and store the result."""
         # 2. Fetch content from news-service
         logger.info(f"Fetching content for news_id={news_id}")
         try:
@@ -119,29 +284,20 @@ class NewsSummarizationService:
         if not content_text:
             raise ValueError(f"News item {news_id} has no content")
 
-        # 3. Run ViT5 → summary_short
-        logger.info(f"Generating ViT5 summary for news_id={news_id}")
-        try:
-            vit5 = get_vit5_summarizer()
-            summary_short = vit5.summarize(content_text)
-        except Exception as e:
-            logger.error(f"ViT5 summarization failed: {e}")
-            # Fallback to position-based
-            logger.info("Falling back to Position-based summarizer for summary_short")
-            position = get_position_summarizer()
-            summary_short = position.summarize(content_text, ratio=0.2)
-
-        # 4. Run PhoBERT → summary_default
-        logger.info(f"Generating PhoBERT summary for news_id={news_id}")
-        try:
-            phobert = get_phobert_summarizer()
-            summary_default = phobert.summarize(content_text)
-        except Exception as e:
-            logger.error(f"PhoBERT summarization failed: {e}")
-            # Fallback to position-based
-            logger.info("Falling back to Position-based summarizer for summary_default")
-            position = get_position_summarizer()
-            summary_default = position.summarize(content_text, ratio=0.3)
+        # 3-4. Run ViT5 → summary_short and PhoBERT → summary_default together;
+        # inference stays serialized, but one model's preprocessing overlaps
+        # the other's forward pass
+        logger.info(f"Generating ViT5 and PhoBERT summaries for news_id={news_id}")
+        summary_short, summary_default = await asyncio.gather(
+            self._summarize_or_fallback(
+                "ViT5", get_vit5_summarizer, content_text, "summary_short",
+                fallback_ratio=0.2, refresh=force
+            ),
+            self._summarize_or_fallback(
+                "PhoBERT", get_phobert_summarizer, content_text, "summary_default",
+                fallback_ratio=0.3, refresh=force
+            ),
+        )
 
         # 5. Upsert into database
         result_data = {
@@ -150,39 +306,43 @@ class NewsSummarizationService:
             KEY_SUMMARY_DEFAULT: summary_default,
         }
 
-        if existing:
-            existing.summary_short = summary_short
-            existing.summary_default = summary_default
-            db.commit()
-            db.refresh(existing)
-            logger.info(f"Updated summaries for news_id={news_id}")
-        else:
-            news_ai_result = NewsAIResult(
-                news_id=news_id,
-                summary_short=summary_short,
-                summary_default=summary_default,
-                audio_files=[],
-            )
-            db.add(news_ai_result)
-            db.commit()
-            db.refresh(news_ai_result)
-            logger.info(f"Created new AI result with summaries for news_id={news_id}")
+        # One atomic statement whether or not the row exists yet
+        stmt = pg_insert(NewsAIResult).values(
+            news_id=news_id,
+            summary_short=summary_short,
+            summary_default=summary_default,
+        )
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[NewsAIResult.news_id],
+            set_={
+                "summary_short": stmt.excluded.summary_short,
+                "summary_default": stmt.excluded.summary_default,
+                "updated_at": func.now(),
+            }
+        ))
+        await db.commit()
+        logger.info(f"Stored summaries for news_id={news_id}")
 
+        self._summary_cache[news_id] = result_data
         return result_data, False
 
-    def get_cached_summaries(
-        self, news_id: int, db: Session
+    async def get_cached_summaries(
+        self, news_id: int, db: AsyncSession
     ) -> Optional[dict]:
         """Get cached summaries without generating."""
-        existing = db.query(NewsAIResult).filter(
-            NewsAIResult.news_id == news_id
-        ).first()
+        cached = self._summary_cache.get(news_id)
+        if cached is not None:
+            return cached
+
+        existing = await self._get_result(news_id, db)
         if existing and (existing.summary_short or existing.summary_default):
-            return {
+            result_data = {
                 KEY_NEWS_ID: news_id,
                 KEY_SUMMARY_SHORT: existing.summary_short,
                 KEY_SUMMARY_DEFAULT: existing.summary_default,
             }
+            self._summary_cache[news_id] = result_data
+            return result_data
         return None
 
 
@@ -1,15 +1,44 @@
 """PhoBERT-based extractive summarizer for Vietnamese text."""
 import logging
+import re
+from typing import Optional
 
 import torch
 import numpy as np
-from transformers import AutoTokenizer, AutoModel
-from sklearn.metrics.pairwise import cosine_similarity
+from transformers import AutoModel
 
+from config import settings
+from services.inference_client import RemoteEmbeddingClient
+from services.onnx_encoder import onnx_enabled, shared_onnx_encoder
+from services.torch_runtime import shared_model, shared_tokenizer, to_device
 from .base_summarizer import BaseSummarizer, clean_text, sentence_tokenize
 
 logger = logging.getLogger(__name__)
 
+# Case, punctuation and spacing are ignored when matching repeated sentences
+_NON_WORD_RE = re.compile(r'\W+')
+
+
+def _dedup_sentences(sentences: list[str]) -> tuple[list[str], list[int]]:
+    """
+    Collapse repeated sentences (bylines, "Theo TTXVN", copy-pasted quotes).
+
+    Returns:
+        Tuple of (unique sentences in first-occurrence order, index into
+        the unique list for every original sentence)
+    """
+    seen: dict[str, int] = {}
+    unique = []
+    back = []
+    for sentence in sentences:
+        key = _NON_WORD_RE.sub('', sentence.lower())
+        index = seen.get(key)
+        if index is None:
+            index = seen[key] = len(unique)
+            unique.append(sentence)
+        back.append(index)
+    return unique, back
+
 
 class PhoBERTSummarizer(BaseSummarizer):
     """
@@ -20,39 +49,145 @@ class PhoBERTSummarizer(BaseSummarizer):
     are returned in their original order.
     
     Result is saved to `summary_default` column.
+    
+    When an `encoder` is given, sentence embeddings come from a shared
+    inference server and no model is loaded in-process. With
+    `phobert_onnx_dir` set, the ONNX export (the same session as the
+    recommendation service) replaces the torch model.
     """
 
-    def __init__(self, model_name: str = "vinai/phobert-base", device: str = None):
+    def __init__(
+        self,
+        model_name: str = "vinai/phobert-base",
+        device: str = None,
+        encoder: Optional[RemoteEmbeddingClient] = None
+    ):
         super().__init__(name="PhoBERT (VietAI)")
+        self.model_name = model_name
+        self.encoder = encoder
+        self.onnx = None
+        if encoder is not None:
+            logger.info(f"PhoBERT embeddings served by {encoder.base_url}")
+            return
+
+        if onnx_enabled(settings.phobert_onnx_dir):
+            logger.info(f"Loading PhoBERT ONNX export from {settings.phobert_onnx_dir}")
+            self.onnx = shared_onnx_encoder(settings.phobert_onnx_dir)
+            self.tokenizer = shared_tokenizer(settings.phobert_onnx_dir)
+            return
+
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(f"Initializing PhoBERT on {self.device}")
 
-        self.model_name = model_name
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModel.from_pretrained(self.model_name).to(self.device)
-        self.model.eval()
+        self.tokenizer = shared_tokenizer(self.model_name)
+        # Ranking sentences tolerates int8 weights; the recommendation service
+        # keeps its own full-precision copy when this is enabled
+        self.model = shared_model(
+            AutoModel, self.model_name, self.device, compile=True,
+            quantize=settings.phobert_summarizer_int8
+        )
+        # Reused page-locked staging buffer for [CLS] rows copied off the GPU
+        self._pinned: Optional[torch.Tensor] = None
         logger.info("PhoBERT model loaded successfully")
 
-    def _get_sentence_embeddings(self, sentences: list[str]) -> np.ndarray:
+    @property
+    def cache_tag(self) -> str:
+        if self.encoder is not None:
+            backend = f"remote={self.encoder.base_url}"
+        elif self.onnx is not None:
+            backend = f"onnx={settings.phobert_onnx_dir}"
+        else:
+            backend = f"int8={settings.phobert_summarizer_int8}"
+        return f"{self.name}:{self.model_name}:{backend}"
+
+    def _tokenize_sentences(self, sentences: list[str]) -> list[tuple[list[int], object]]:
+        """
+        Tokenize sentences into padded batches on the CPU (tensors stay on the host).
+
+        All sentences are tokenized in one call, then sorted by token count
+        and padded per batch so each batch pads to a similar length; at most
+        `phobert_batch_size` sentences per batch.
+
+        Returns:
+            List of (sentence indices, tokenizer output) per batch
+        """
+        encoded = self.tokenizer(sentences, truncation=True, max_length=256)
+        input_ids = encoded["input_ids"]
+        order = sorted(range(len(sentences)), key=lambda i: len(input_ids[i]))
+        batch_size = settings.phobert_batch_size
+        batches = []
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            batches.append((indices, self.tokenizer.pad(
+                {key: [encoded[key][i] for i in indices] for key in encoded.keys()},
+                return_tensors="np" if self.onnx is not None else "pt"
+            )))
+        return batches
+
+    def _get_sentence_embeddings(self, sentences: list[str], encoded: list) -> np.ndarray:
         """Get [CLS] token embeddings for each sentence."""
-        embeddings = []
-        for sentence in sentences:
-            inputs = self.tokenizer(
-                sentence,
-                return_tensors="pt",
-                padding=True,
-                truncation=True,
-                max_length=256
-            ).to(self.device)
+        if self.encoder is not None:
+            return self.encoder.embed(sentences)
+
+        if self.onnx is not None:
+            embeddings = None
+            for indices, inputs in encoded:
+                cls = self.onnx.cls_embeddings(inputs)
+                if embeddings is None:
+                    embeddings = np.empty((len(sentences), cls.shape[1]), dtype=np.float32)
+                embeddings[indices] = cls
+            return embeddings
+
+        # Queue every batch before reading anything back, so the device is
+        # synchronized once for the whole article instead of once per batch
+        order = []
+        cls_batches = []
+        with torch.inference_mode():
+            for indices, inputs in encoded:
+                outputs = self.model(**to_device(inputs, self.device))
+                # Use the [CLS] token embedding as the sentence embedding
+                cls_batches.append(outputs.last_hidden_state[:, 0, :])
+                order.extend(indices)
+
+            embeddings = np.empty((len(sentences), self.model.config.hidden_size), dtype=np.float32)
+            embeddings[order] = self._to_host(torch.cat(cls_batches).float())
+
+        return embeddings
+
+    def _to_host(self, cls: torch.Tensor) -> np.ndarray:
+        """
+        Copy [CLS] rows to the host.
 
-            with torch.no_grad():
-                outputs = self.model(**inputs)
+        On CUDA the copy goes through a page-locked buffer that is reused
+        (and only grown) across articles, avoiding a pageable transfer and
+        a fresh pinned allocation per call. Summaries run on a single
+        inference thread, so the buffer is never shared concurrently.
+        """
+        if cls.device.type != "cuda":
+            return cls.numpy()
+        n = cls.shape[0]
+        if self._pinned is None or self._pinned.shape[0] < n:
+            self._pinned = torch.empty((max(n, 64), cls.shape[1]), dtype=cls.dtype, pin_memory=True)
+        staging = self._pinned[:n]
+        staging.copy_(cls, non_blocking=True)
+        torch.cuda.current_stream(cls.device).synchronize()
+        return staging.numpy()
+
+    def preprocess(self, text: str, ratio: float = 0.3) -> tuple[str, list[str], list[int], list]:
+        """
+        Clean, sentence-split, deduplicate and tokenize the text.
 
-            # Use the [CLS] token embedding as the sentence embedding
-            sentence_embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-            embeddings.append(sentence_embedding[0])
+        Only unique sentences are tokenized and embedded.
 
-        return np.array(embeddings)
+        Returns:
+            Tuple of (cleaned text, unique sentences, unique index of every
+            original sentence, batched tokenizer output)
+        """
+        text = clean_text(text)
+        sentences, back = _dedup_sentences(sentence_tokenize(text))
+        if len(back) <= 2 or self.encoder is not None:
+            return text, sentences, back, []
+        return text, sentences, back, self._tokenize_sentences(sentences)
 
     def summarize(self, text: str, ratio: float = 0.3) -> str:
         """
@@ -65,32 +200,41 @@ class PhoBERTSummarizer(BaseSummarizer):
         Returns:
             Summary string
         """
-        text = clean_text(text)
-        sentences = sentence_tokenize(text)
+        return self.summarize_prepared(self.preprocess(text, ratio), ratio)
 
-        if len(sentences) <= 2:
+    def summarize_prepared(self, prepared: tuple[str, list[str], list[int], list], ratio: float = 0.3) -> str:
+        """Rank the pre-tokenized sentences and assemble the summary."""
+        text, sentences, back, encoded = prepared
+
+        if len(back) <= 2:
             return text
 
         # Get sentence embeddings
-        embeddings = self._get_sentence_embeddings(sentences)
-
-        # Compute cosine similarity between sentences
-        sim_matrix = cosine_similarity(embeddings)
-
-        # Score sentences using PageRank-like algorithm
-        scores = np.sum(sim_matrix, axis=1)
+        embeddings = self._get_sentence_embeddings(sentences, encoded)
+
+        # Score each sentence by its summed cosine similarity to all sentences
+        # (PageRank-like centrality). With unit vectors, sum_j e_i.e_j equals
+        # e_i.(sum_j e_j), so one matrix-vector product replaces the N x N matrix.
+        # Repeated sentences count once per occurrence in the sum, as before
+        # deduplication, but are only selected once
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        unit = embeddings / norms
+        counts = np.bincount(back, minlength=len(sentences)).astype(unit.dtype)
+        scores = unit @ (counts @ unit)
         ranked_indices = sorted(
             range(len(sentences)),
             key=lambda i: scores[i],
             reverse=True
         )
 
-        # Select top sentences and preserve original order
-        num_sentences = max(1, int(len(sentences) * ratio))
+        # Select top sentences and preserve original order (unique sentences
+        # are kept in first-occurrence order)
+        num_sentences = min(len(sentences), max(1, int(len(back) * ratio)))
         selected_indices = sorted(ranked_indices[:num_sentences])
 
         summary = " ".join([sentences[i] for i in selected_indices])
         logger.info(
-            f"PhoBERT summary: {len(sentences)} sentences → {num_sentences} selected"
+            f"PhoBERT summary: {len(back)} sentences ({len(sentences)} unique) → {num_sentences} selected"
         )
         return summary
@@ -34,22 +34,12 @@ class PositionSummarizer(BaseSummarizer):
         if len(sentences) <= 2:
             return text
 
-        # Score sentences: earlier = higher score
+        # Earlier sentences score strictly higher, so the top-ranked
+        # sentences are simply the leading ones, already in original order
         num_sent = len(sentences)
-        scores = [1.0 - (i / num_sent) for i in range(num_sent)]
-
-        # Rank by score
-        ranked_indices = sorted(
-            range(num_sent),
-            key=lambda i: scores[i],
-            reverse=True
-        )
-
-        # Select top sentences and preserve original order
         num_sentences = max(1, int(num_sent * ratio))
-        selected_indices = sorted(ranked_indices[:num_sentences])
 
-        summary = " ".join([sentences[i] for i in selected_indices])
+        summary = " ".join(sentences[:num_sentences])
         logger.info(
             f"Position summary: {num_sent} sentences → {num_sentences} selected"
         )
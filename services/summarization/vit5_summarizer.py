@@ -3,12 +3,32 @@ import re
 import logging
 
 import torch
-from transformers import AutoTokenizer, T5ForConditionalGeneration
+from transformers import T5ForConditionalGeneration
 
-from .base_summarizer import BaseSummarizer, clean_text
+from config import settings
+from services.inference_client import RemoteCompletionClient
+from services.onnx_encoder import OnnxBeamSearch
+from services.torch_runtime import shared_model, shared_tokenizer, to_device
+from .base_summarizer import BaseSummarizer, clean_text, sentence_tokenize
 
 logger = logging.getLogger(__name__)
 
+# Prompt prefixes to try (the fine-tuned model may expect different prefixes)
+PROMPT_PREFIXES = ("summarize: ", "tóm tắt: ", "")
+
+# Post-processing patterns, compiled once
+_INVALID_CHARS_RE = re.compile(r'[^\x00-\x7F\u00C0-\u1EF9\s.,!?:;]')
+_WHITESPACE_RE = re.compile(r'\s+')
+# Unit length is bounded so pathological outputs cannot backtrack for long
+_REPETITION_RE = re.compile(r'(.{1,100}?)\1{2,}')
+
+VIETNAMESE_CHARS = frozenset(
+    "abcdefghijklmnopqrstuvwxyz"
+    "áàảãạăắằẳẵặâấầẩẫậéèẻẽẹêếềểễệ"
+    "íìỉĩịóòỏõọôốồổỗộơớờởỡợ"
+    "úùủũụưứừửữựýỳỷỹỵđ"
+)
+
 
 class ViT5Summarizer(BaseSummarizer):
     """
@@ -20,43 +40,158 @@ class ViT5Summarizer(BaseSummarizer):
     Result is saved to `summary_short` column.
     """
 
+    # model_name -> first prompt prefix that produced Vietnamese output;
+    # later summaries try it first and usually generate only once
+    _prompt_prefixes: dict[str, str] = {}
+
     def __init__(
         self,
         model_name: str = "VietAI/vit5-base-vietnews-summarization",
-        device: str = None
+        device: str = None,
+        num_beams: int = None,
+        max_length: int = None
     ):
         super().__init__(name="ViT5")
+        self._set_decoding(num_beams, max_length)
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(f"Initializing ViT5 on {self.device}")
 
         self.model_name = model_name
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = T5ForConditionalGeneration.from_pretrained(
-                self.model_name
-            ).to(self.device)
-            self.model.eval()
+            self.tokenizer = shared_tokenizer(self.model_name)
+            # T5 activations overflow in float16, so only bfloat16 is allowed
+            self.model = shared_model(
+                T5ForConditionalGeneration, self.model_name, self.device, allow_fp16=False, compile=True
+            )
             logger.info(f"Successfully loaded ViT5 model: {self.model_name}")
         except Exception as e:
             logger.warning(f"Error loading ViT5 model {self.model_name}: {e}")
             # Fallback to base model
             self.model_name = "VietAI/vit5-base"
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-            self.model = T5ForConditionalGeneration.from_pretrained(
-                self.model_name
-            ).to(self.device)
-            self.model.eval()
+            self.tokenizer = shared_tokenizer(self.model_name)
+            self.model = shared_model(
+                T5ForConditionalGeneration, self.model_name, self.device, allow_fp16=False, compile=True
+            )
             logger.info("Using fallback ViT5 base model")
 
+        self.draft_model = self._load_draft_model()
+
+    def _load_draft_model(self):
+        """
+        Small ViT5 used for assisted (speculative) decoding, if configured.
+
+        The draft proposes several tokens per step and the main model
+        verifies them in one forward pass; the output equals plain greedy
+        decoding. HF assisted generation only supports num_beams=1.
+        """
+        if not settings.vit5_draft_model_name:
+            return None
+        if self.num_beams != 1:
+            logger.warning("VIT5_DRAFT_MODEL_NAME ignored: assisted decoding requires VIT5_NUM_BEAMS=1")
+            return None
+        try:
+            draft = shared_model(
+                T5ForConditionalGeneration, settings.vit5_draft_model_name, self.device, allow_fp16=False
+            )
+            logger.info(f"Assisted decoding with draft model {settings.vit5_draft_model_name}")
+            return draft
+        except Exception as e:
+            logger.warning(f"Could not load ViT5 draft model, using plain decoding: {e}")
+            return None
+
+    def _set_decoding(self, num_beams: int = None, max_length: int = None):
+        """Beam count and output length (decoder cost grows with both)."""
+        self.num_beams = num_beams or settings.vit5_num_beams
+        self.max_length = max_length or settings.vit5_max_length
+
+    @property
+    def cache_tag(self) -> str:
+        # model_name is the one actually loaded (it may be the base fallback)
+        return (
+            f"{self.name}:{self.model_name}:beams={self.num_beams}:max_len={self.max_length}"
+            f":chunk={settings.vit5_max_input_tokens}/{settings.vit5_chunk_tokens}"
+        )
+
     def _post_process(self, summary: str) -> str:
         """Clean up generated summary text."""
         # Remove invalid characters
-        summary = re.sub(r'[^\x00-\x7F\u00C0-\u1EF9\s.,!?:;]', '', summary)
+        summary = _INVALID_CHARS_RE.sub('', summary)
         # Fix spacing
-        summary = re.sub(r'\s+', ' ', summary).strip()
+        summary = _WHITESPACE_RE.sub(' ', summary).strip()
         # Remove excessive repetition
-        summary = re.sub(r'(.+?)\1{2,}', r'\1', summary)
-        return summary
+        return _REPETITION_RE.sub(r'\1', summary)
+
+    def _prompts(self, prefix: str, text: str) -> list[str]:
+        """
+        Model prompts for one article.
+
+        Articles longer than `vit5_max_input_tokens` are split on sentence
+        boundaries into chunks of about `vit5_chunk_tokens` tokens (one
+        prompt each) instead of being truncated; k short encoder passes
+        also cost less than one long one.
+        """
+        if len(self.tokenizer(text, add_special_tokens=False)["input_ids"]) <= settings.vit5_max_input_tokens:
+            return [prefix + text]
+
+        sentences = sentence_tokenize(text)
+        counts = [len(ids) for ids in self.tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+        chunks = []
+        current = []
+        size = 0
+        for sentence, count in zip(sentences, counts):
+            if current and size + count > settings.vit5_chunk_tokens:
+                chunks.append(" ".join(current))
+                current = []
+                size = 0
+            current.append(sentence)
+            size += count
+        if current:
+            chunks.append(" ".join(current))
+        return [prefix + chunk for chunk in chunks]
+
+    def _tokenize(self, prompts: list[str]):
+        """
+        Tokenize prompts on the CPU (tensors stay on the host).
+
+        Prompts are padded to the longest one only, so the encoder attends
+        over real tokens instead of always 1024.
+        """
+        return self.tokenizer(
+            prompts,
+            return_tensors="pt",
+            max_length=1024,
+            truncation=True,
+            padding=True,
+            add_special_tokens=True,
+        )
+
+    def _decode(self, summary_ids) -> list[str]:
+        return self.tokenizer.batch_decode(
+            summary_ids,
+            skip_special_tokens=True,
+            clean_up_tokenization_spaces=True,
+        )
+
+    def _generate(self, inputs) -> list[str]:
+        """Run beam-search generation for a batch of tokenized prompts and decode the results."""
+        inputs = to_device(inputs, self.device)
+
+        with torch.inference_mode():
+            summary_ids = self.model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_length=self.max_length,
+                min_length=30,
+                num_beams=self.num_beams,
+                length_penalty=2.0,
+                early_stopping=True,
+                no_repeat_ngram_size=3,
+                do_sample=False,
+                # Assisted generation only supports a batch of one prompt
+                assistant_model=self.draft_model if len(inputs["input_ids"]) == 1 else None,
+            )
+
+        return self._decode(summary_ids)
 
     def summarize(self, text: str, ratio: float = 0.3) -> str:
         """
@@ -69,56 +204,49 @@ class ViT5Summarizer(BaseSummarizer):
         Returns:
             Summary string
         """
-        text = clean_text(text)
+        return self.summarize_prepared(self.preprocess(text, ratio), ratio)
+
+    def _prefix_order(self) -> list[str]:
+        """Prompt prefixes in the order to try them, known-good prefix first."""
+        winner = self._prompt_prefixes.get(self.model_name)
+        if winner is None:
+            return list(PROMPT_PREFIXES)
+        return [winner] + [prefix for prefix in PROMPT_PREFIXES if prefix != winner]
+
+    def preprocess(self, text: str, ratio: float = 0.3) -> tuple[str, list[str], object]:
+        """
+        Clean the text and tokenize the first prompt to try.
 
-        # Prompt formats to try (the fine-tuned model may expect different prefixes)
-        prompt_formats = [
-            f"summarize: {text}",
-            f"tóm tắt: {text}",
-            text,
-        ]
+        The other prompt variants are only tokenized if the first one fails.
 
+        Returns:
+            Tuple of (cleaned text, prefixes in try order, inputs for the first prefix)
+        """
+        text = clean_text(text)
+        prefixes = self._prefix_order()
+        return text, prefixes, self._tokenize(self._prompts(prefixes[0], text))
+
+    def summarize_prepared(self, prepared: tuple[str, list[str], object], ratio: float = 0.3) -> str:
+        """Generate from each prompt variant until one yields Vietnamese text."""
+        text, prefixes, first_inputs = prepared
         summary = "Không thể tạo tóm tắt (Unable to generate summary)"
 
-        for prompt in prompt_formats:
+        for i, prefix in enumerate(prefixes):
+            prompt = prefix + text
             try:
-                inputs = self.tokenizer(
-                    prompt,
-                    return_tensors="pt",
-                    max_length=1024,
-                    truncation=True,
-                    padding="max_length",
-                    add_special_tokens=True,
-                ).to(self.device)
-
-                with torch.no_grad():
-                    summary_ids = self.model.generate(
-                        inputs.input_ids,
-                        attention_mask=inputs.attention_mask,
-                        max_length=256,
-                        min_length=30,
-                        num_beams=4,
-                        length_penalty=2.0,
-                        early_stopping=True,
-                        no_repeat_ngram_size=3,
-                        do_sample=False,
-                    )
-
-                decoded = self.tokenizer.decode(
-                    summary_ids[0],
-                    skip_special_tokens=True,
-                    clean_up_tokenization_spaces=True,
-                )
+                inputs = first_inputs if i == 0 else self._tokenize(self._prompts(prefix, text))
+                parts = self._generate(inputs)
+                decoded = " ".join(parts)
+                if len(parts) > 1:
+                    # Long article: summarize the chunk summaries once more
+                    decoded = " ".join(self._generate(self._tokenize(self._prompts(prefix, decoded))))
 
                 # Validate that the output contains Vietnamese/Latin characters
-                vietnamese_chars = (
-                    "abcdefghijklmnopqrstuvwxyz"
-                    "áàảãạăắằẳẵặâấầẩẫậéèẻẽẹêếềểễệ"
-                    "íìỉĩịóòỏõọôốồổỗộơớờởỡợ"
-                    "úùủũụưứừửữựýỳỷỹỵđ"
-                )
-                if any(c in decoded.lower() for c in vietnamese_chars):
+                if not VIETNAMESE_CHARS.isdisjoint(decoded.lower()):
                     summary = decoded
+                    if self.model_name not in self._prompt_prefixes:
+                        self._prompt_prefixes[self.model_name] = prefix
+                        logger.info(f"ViT5 prompt prefix for {self.model_name}: {prefix!r}")
                     break
             except Exception as e:
                 logger.warning(f"Error with prompt format '{prompt[:30]}...': {e}")
@@ -126,3 +254,77 @@ class ViT5Summarizer(BaseSummarizer):
         summary = self._post_process(summary)
         logger.info(f"ViT5 summary generated: {len(summary)} chars")
         return summary
+
+
+class OnnxViT5Summarizer(ViT5Summarizer):
+    """
+    ViT5 summarizer whose beam search runs in ONNX Runtime.
+
+    Uses a `convert_generation` export (see OnnxBeamSearch) with the same
+    decoding settings as ViT5Summarizer, so no torch model is loaded.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "VietAI/vit5-base-vietnews-summarization",
+        num_beams: int = None,
+        max_length: int = None
+    ):
+        BaseSummarizer.__init__(self, name="ViT5 (ONNX)")
+        self._set_decoding(num_beams, max_length)
+        self.model_name = model_name
+        self.tokenizer = shared_tokenizer(self.model_name)
+        self.generator = OnnxBeamSearch(settings.vit5_onnx_model)
+
+    def _tokenize(self, prompts: list[str]):
+        return self.tokenizer(
+            prompts,
+            return_tensors="np",
+            max_length=1024,
+            truncation=True,
+            padding=True,
+            add_special_tokens=True,
+        )
+
+    def _generate(self, inputs) -> list[str]:
+        # no_repeat_ngram_size / early_stopping are fixed at export time
+        summary_ids = self.generator.generate(
+            inputs,
+            max_length=self.max_length,
+            min_length=30,
+            num_beams=self.num_beams,
+            length_penalty=2.0,
+        )
+        return self._decode(summary_ids)
+
+
+class RemoteViT5Summarizer(ViT5Summarizer):
+    """
+    ViT5 summarizer whose generation runs on a shared inference server.
+
+    Keeps the prompt fallback and post-processing of ViT5Summarizer but
+    sends each prompt to an OpenAI-compatible completions endpoint, so the
+    model is loaded once server-side and requests batch across workers.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "VietAI/vit5-base-vietnews-summarization",
+        max_length: int = None
+    ):
+        BaseSummarizer.__init__(self, name="ViT5 (remote)")
+        self._set_decoding(max_length=max_length)
+        self.model_name = model_name
+        self.client = RemoteCompletionClient(model_name=model_name)
+        logger.info(f"ViT5 generation served by {self.client.base_url}")
+
+    def _prompts(self, prefix: str, text: str) -> list[str]:
+        # No local tokenizer to measure the article; the server truncates
+        return [prefix + text]
+
+    def _tokenize(self, prompts: list[str]) -> list[str]:
+        # The server tokenizes; the prompts themselves are the model input
+        return prompts
+
+    def _generate(self, prompts: list[str]) -> list[str]:
+        return [self.client.complete(prompt, max_tokens=self.max_length) for prompt in prompts]
@@ -0,0 +1,127 @@
+"""Shared setup for in-process PyTorch (Hugging Face) inference models."""
+import logging
+import threading
+from functools import lru_cache
+
+import torch
+from transformers import AutoTokenizer
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# (model class, name, device, ...) -> loaded model shared between services
+_shared_models: dict = {}
+_shared_models_lock = threading.Lock()
+
+# Allow TF32 / reduced-precision float32 matmul kernels where the hardware has them
+torch.set_float32_matmul_precision("high")
+
+# Intra-op threads for CPU inference (0 keeps torch's default of one per physical core)
+if settings.torch_num_threads > 0:
+    torch.set_num_threads(settings.torch_num_threads)
+
+
+def inference_dtype(device: str, allow_fp16: bool = True) -> torch.dtype:
+    """
+    Weight dtype for a model on `device`.
+
+    With `model_half_precision_on_gpu` set, CUDA models use bfloat16, or
+    float16 on GPUs without bf16 support when the model tolerates it.
+    Everything else stays float32.
+    """
+    if not (settings.model_half_precision_on_gpu and str(device).startswith("cuda")):
+        return torch.float32
+    if torch.cuda.is_bf16_supported():
+        return torch.bfloat16
+    return torch.float16 if allow_fp16 else torch.float32
+
+
+def load_model(
+    model_cls,
+    model_name: str,
+    device: str,
+    allow_fp16: bool = True,
+    compile: bool = False,
+    quantize: bool = False
+) -> torch.nn.Module:
+    """
+    Load a pretrained model directly in its inference dtype, move it to its
+    device and put it in eval mode.
+
+    Callers must convert outputs with `.float()` before `.numpy()`.
+
+    Args:
+        compile: Compile the model's forward with torch.compile on CUDA when
+            `model_compile_on_gpu` is set. The module itself is kept, so
+            `generate()` and `config` work unchanged and every decoding
+            step runs the compiled forward.
+        quantize: On CPU, replace Linear layers with dynamically quantized
+            int8 ones (weights int8, activations quantized per batch).
+            Ignored on GPU.
+    """
+    dtype = inference_dtype(device, allow_fp16)
+    model = model_cls.from_pretrained(model_name, torch_dtype=dtype).to(device)
+    model.eval()
+    if dtype != torch.float32:
+        logger.info(f"{model_name} loaded in {dtype}")
+    if quantize and not str(device).startswith("cuda"):
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info(f"{model_name} Linear layers quantized to int8")
+    if compile and settings.model_compile_on_gpu and str(device).startswith("cuda"):
+        try:
+            # dynamic=True: batches vary in size and sequence length, so avoid
+            # recompiling for every new shape
+            model.forward = torch.compile(model.forward, mode=settings.model_compile_mode, dynamic=True)
+            logger.info(f"{model_name} compiled with torch.compile ({settings.model_compile_mode})")
+        except Exception as e:
+            logger.warning(f"torch.compile unavailable for {model_name}, running eagerly: {e}")
+    return model
+
+
+def to_device(inputs, device: str):
+    """
+    Move tokenizer output to `device` for a forward pass.
+
+    On CUDA the tensors go through pinned host memory with non-blocking
+    copies, so the transfer overlaps with queued GPU work instead of
+    stalling the host; the next device-to-host read synchronizes.
+    """
+    if not str(device).startswith("cuda"):
+        return inputs
+    return {
+        key: value.pin_memory().to(device, non_blocking=True)
+        for key, value in inputs.items()
+    }
+
+
+@lru_cache(maxsize=None)
+def shared_tokenizer(model_name: str):
+    """AutoTokenizer for `model_name` (hub id or local dir), loaded once per process."""
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def shared_model(
+    model_cls,
+    model_name: str,
+    device: str,
+    allow_fp16: bool = True,
+    compile: bool = False,
+    quantize: bool = False
+) -> torch.nn.Module:
+    """
+    `load_model`, but one instance per (class, name, device, options) for
+    the whole process, e.g. the PhoBERT encoder used by both the
+    recommendation service and the extractive summarizer.
+
+    Only share models that are used read-only (eval mode, no fine-tuning).
+    """
+    key = (model_cls, model_name, str(device), allow_fp16, compile, quantize)
+    with _shared_models_lock:
+        model = _shared_models.get(key)
+        if model is None:
+            model = load_model(model_cls, model_name, device, allow_fp16, compile, quantize)
+            _shared_models[key] = model
+        else:
+            logger.info(f"Reusing loaded {model_name} on {device}")
+    return model
@@ -1,5 +1,5 @@
 from .service import TTSService, tts_service
-from .models import TTSRequest, TTSResponse, AudioInfo, NewsTTSResponse
+from .models import TTSRequest, TTSResponse, AudioInfo, NewsTTSResponse, AUDIO_INFO_LIST_ADAPTER
 from .news_tts_service import NewsTTSService, news_tts_service, AVAILABLE_VOICES
 
 __all__ = [
@@ -8,6 +8,7 @@ __all__ = [
     "TTSRequest", 
     "TTSResponse",
     "AudioInfo",
+    "AUDIO_INFO_LIST_ADAPTER",
     "NewsTTSResponse",
     "NewsTTSService",
     "news_tts_service",
@@ -0,0 +1,85 @@
+"""
+Incremental Ogg/Opus encoding for streamed TTS audio.
+"""
+import io
+import logging
+from typing import Iterable, Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# PyAV (FFmpeg bindings) provides the libopus encoder and Ogg muxer
+try:
+    import av
+    HAS_PYAV = True
+except ImportError:
+    HAS_PYAV = False
+    logger.warning("PyAV not installed, TTS audio streaming is unavailable")
+
+
+class OggOpusEncoder:
+    """
+    Encode mono float32 PCM chunks to Ogg/Opus and hand back the bytes
+    produced so far after each chunk.
+    """
+
+    def __init__(self, sample_rate: int, bitrate: int = 32000):
+        if not HAS_PYAV:
+            raise RuntimeError("PyAV is required for Opus streaming")
+        self._buffer = io.BytesIO()
+        self._offset = 0
+        self._pts = 0
+        self._container = av.open(self._buffer, mode="w", format="ogg")
+        self._stream = self._container.add_stream("libopus", rate=sample_rate, layout="mono")
+        self._stream.bit_rate = bitrate
+        self.sample_rate = sample_rate
+
+    def encode(self, pcm: np.ndarray) -> bytes:
+        """Encode one PCM chunk and return newly muxed bytes (may be empty)."""
+        samples = np.ascontiguousarray(pcm, dtype=np.float32).reshape(1, -1)
+        frame = av.AudioFrame.from_ndarray(samples, format="flt", layout="mono")
+        frame.sample_rate = self.sample_rate
+        frame.pts = self._pts
+        self._pts += samples.shape[1]
+        for packet in self._stream.encode(frame):
+            self._container.mux(packet)
+        return self._drain()
+
+    def close(self) -> bytes:
+        """Flush the encoder, finalize the container and return the tail bytes."""
+        for packet in self._stream.encode(None):
+            self._container.mux(packet)
+        self._container.close()
+        return self._drain()
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue()[self._offset:]
+        self._offset += len(data)
+        return data
+
+
+def encode_ogg_opus(
+    chunks: Iterable[np.ndarray],
+    sample_rate: int,
+    bitrate: int = 32000
+) -> Iterator[bytes]:
+    """
+    Lazily encode an iterable of PCM chunks into an Ogg/Opus byte stream.
+
+    Args:
+        chunks: 1-D float32 PCM arrays
+        sample_rate: Sample rate of the PCM data
+        bitrate: Target Opus bitrate in bits/s
+
+    Yields:
+        Ogg/Opus bytes, suitable for a chunked HTTP response
+    """
+    encoder = OggOpusEncoder(sample_rate, bitrate)
+    for chunk in chunks:
+        data = encoder.encode(chunk)
+        if data:
+            yield data
+    tail = encoder.close()
+    if tail:
+        yield tail
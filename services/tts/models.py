@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional
 
 
@@ -77,6 +77,11 @@ class AudioInfo(BaseModel):
         }
 
 
+
+# Validates a whole list of audio dicts in one call (keys match AudioInfo fields)
+AUDIO_INFO_LIST_ADAPTER = TypeAdapter(List[AudioInfo])
+
+
 class NewsTTSResponse(BaseModel):
     """Response model for news article TTS generation."""
     
@@ -1,12 +1,16 @@
 """News TTS Service - Generate TTS audio for news articles."""
+import asyncio
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-import redis.asyncio as aioredis
-from sqlalchemy.orm import Session
+from cachetools import TTLCache
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
-from db.models import NewsAIResult
+from db.models import NewsAIResult, NewsAudioFile
+from services import cache
 from services.constants import (
     FIELD_CONTENT_PLAIN_TEXT,
     TTS_PREFIX_KEY,
@@ -18,6 +22,7 @@ from services.constants import (
     KEY_PRESIGNED_URL,
     KEY_FILENAME
 )
+from services.inflight import InflightRequests
 from services.news_client import news_client
 from services.tts.service import tts_service
 from services.tts.storage import tts_storage
@@ -50,72 +55,131 @@ class NewsTTSService:
             voices: List of voice configurations. Defaults to AVAILABLE_VOICES.
         """
         self.voices = voices or AVAILABLE_VOICES
-        self._redis = None
+        # news_id -> stored audio_files, so hot GETs skip PostgreSQL
+        self._audio_cache: TTLCache = TTLCache(
+            maxsize=settings.response_cache_size,
+            ttl=settings.response_cache_ttl
+        )
+        # Concurrent generate calls for the same news_id (and presigned URL
+        # lookups for the same audio files) share one run
+        self._inflight = InflightRequests()
+
+    async def _get_presigned_urls_batch(self, s3_keys: List[str]) -> Dict[str, str]:
+        """
+        Get presigned URLs from Redis cache or generate new ones.
 
-    async def _get_redis(self):
-        """Get or create Redis connection (lazy initialization)."""
-        if self._redis is None:
-            try:
-                self._redis = aioredis.from_url(
-                    settings.redis_url,
-                    decode_responses=False
-                )
-                # Test connection
-                await self._redis.ping()
-                logger.info(f"Redis connected: {settings.redis_url}")
-            except Exception as e:
-                logger.warning(f"Redis not available: {e}")
-                self._redis = None
-        return self._redis
+        All keys are read with one MGET and the generated misses written
+        back in one pipeline, so a response costs at most two round trips
+        regardless of the number of voices.
 
-    async def _get_presigned_url_cached(self, s3_key: str) -> Optional[str]:
-        """
-        Get presigned URL from Redis cache or generate a new one.
+        Returns:
+            Mapping of s3_key -> presigned URL (keys that failed are omitted)
         """
-        if not s3_key:
-            return None
+        if not s3_keys:
+            return {}
 
-        redis_key = f"{TTS_PREFIX_KEY}:{s3_key}"
-        redis = await self._get_redis()
+        redis_keys = [f"{TTS_PREFIX_KEY}:{s3_key}" for s3_key in s3_keys]
+        redis = await cache.get_redis()
+        urls: Dict[str, str] = {}
 
         # 1. Try to get from Redis
         if redis:
             try:
-                cached_url = await redis.get(redis_key)
-                if cached_url:
-                    return cached_url.decode("utf-8")
+                cached_urls = await redis.mget(redis_keys)
+                for s3_key, cached_url in zip(s3_keys, cached_urls):
+                    if cached_url:
+                        urls[s3_key] = cached_url.decode("utf-8")
             except Exception as e:
                 logger.warning(f"Failed to read from Redis: {e}")
 
-        # 2. Generate new URL
+        # 2. Generate new URLs
         # Default expiration 24 hours (86400s)
         expiration = 86400
-        url = tts_storage.generate_presigned_url(s3_key, expiration=expiration)
-
-        if not url:
-            return None
+        generated = {}
+        for s3_key in s3_keys:
+            if s3_key in urls:
+                continue
+            url = tts_storage.generate_presigned_url(s3_key, expiration=expiration)
+            if url:
+                generated[s3_key] = url
+        urls.update(generated)
 
         # 3. Save to Redis
-        if redis:
+        if redis and generated:
             try:
-                # Cache for slightly less time than expiration to be safe
-                await redis.set(redis_key, url, ex=expiration - 60)
+                async with redis.pipeline(transaction=False) as pipe:
+                    for s3_key, url in generated.items():
+                        # Cache for slightly less time than expiration to be safe
+                        pipe.set(f"{TTS_PREFIX_KEY}:{s3_key}", url, ex=expiration - 60)
+                    await pipe.execute()
             except Exception as e:
                 logger.warning(f"Failed to write to Redis: {e}")
 
-        return url
+        return urls
+
+    async def _attach_presigned_urls(self, audio_files: List[dict]):
+        """Set KEY_PRESIGNED_URL on every audio dict that has an S3 key (in place)."""
+        s3_keys = tuple(audio[KEY_S3_KEY] for audio in audio_files if audio.get(KEY_S3_KEY))
+        # A burst of requests for the same article shares one Redis lookup
+        # and one round of signing/caching of the misses
+        urls = await self._inflight.run(
+            ("presign", s3_keys), lambda: self._get_presigned_urls_batch(list(s3_keys))
+        )
+        for audio in audio_files:
+            if audio.get(KEY_S3_KEY):
+                audio[KEY_PRESIGNED_URL] = urls.get(audio[KEY_S3_KEY])
+
+    @staticmethod
+    async def _get_audio_rows(news_id: int, db: AsyncSession) -> tuple[Optional[int], List[dict]]:
+        """
+        Load the stored audio files of a news item in one query.
+
+        Plain rows are selected (no ORM objects, no summary columns): the
+        result id is joined with its audio files through the unique
+        news_id index.
+
+        Returns:
+            Tuple of (NewsAIResult id or None if there is no row, audio info dicts)
+        """
+        result = await db.execute(
+            select(
+                NewsAIResult.id,
+                NewsAudioFile.voice_id,
+                NewsAudioFile.description,
+                NewsAudioFile.url,
+                NewsAudioFile.s3_key,
+                NewsAudioFile.filename,
+            )
+            .outerjoin(NewsAudioFile, NewsAudioFile.news_ai_result_id == NewsAIResult.id)
+            .where(NewsAIResult.news_id == news_id)
+            .order_by(NewsAudioFile.id)
+        )
+        rows = result.all()
+        if not rows:
+            return None, []
+        audio_files = [
+            {
+                KEY_VOICE_ID: row.voice_id,
+                KEY_DESCRIPTION: row.description,
+                KEY_URL: row.url,
+                KEY_S3_KEY: row.s3_key,
+                KEY_FILENAME: row.filename,
+            }
+            for row in rows if row.voice_id is not None
+        ]
+        return rows[0].id, audio_files
 
     async def get_or_generate_audio(
             self,
             news_id: int,
-            db: Session
+            db: AsyncSession
     ) -> tuple[List[dict], bool]:
         """
         Get existing audio or generate new TTS audio for a news article.
         
         Args:
             news_id: ID of the news item
-            db: Database session
+            db: Async database session
             
         Returns:
             Tuple of (list of audio info dicts, cached: bool)
@@ -124,16 +188,26 @@ class NewsTTSService:
             ValueError: If news item not found
             RuntimeError: If TTS generation fails
         """
-        # 1. Check if audio already exists in database
-        existing = db.query(NewsAIResult).filter(NewsAIResult.news_id == news_id).first()
-        if existing and existing.audio_files:
+        # 1. Check if audio already exists in database (for every voice)
+        result_id, stored = await self._get_audio_rows(news_id, db)
+        if stored and not self._missing_voices(stored):
             logger.info(f"Found cached audio for news_id={news_id}")
             # Enrich with presigned URLs from Redis
-            for audio in existing.audio_files:
-                if KEY_S3_KEY in audio:
-                    audio[KEY_PRESIGNED_URL] = await self._get_presigned_url_cached(audio[KEY_S3_KEY])
-            return existing.audio_files, True
+            await self._attach_presigned_urls(stored)
+            return stored, True
+
+        return await self._inflight.run(
+            news_id, lambda: self._generate_audio(news_id, result_id, stored, db)
+        )
 
+    async def _generate_audio(
+            self,
+            news_id: int,
+            result_id: Optional[int],
+            stored: List[dict],
+            db: AsyncSession
+    ) -> tuple[List[dict], bool]:
+        """Fetch content, synthesize the voices not stored yet and store the result."""
         # 2. Fetch content from news-service
         logger.info(f"Fetching content for news_id={news_id}")
         try:
@@ -149,124 +223,239 @@ class NewsTTSService:
         if not content_text:
             raise ValueError(f"News item {news_id} has no content")
 
-        # 3. Generate audio for each voice
-        logger.info(f"Generating TTS audio for news_id={news_id} with {len(self.voices)} voices")
-        audio_files = []
+        # 3. Generate audio for all missing voices concurrently (inference is
+        #    serialized inside tts_service, async uploads overlap with the next
+        #    synthesis); one failing voice does not discard the others
+        voices = self._missing_voices(stored)
+        logger.info(f"Generating TTS audio for news_id={news_id} with {len(voices)} voices")
+        # The text frontend is the same for every voice; run it once where
+        # VieNeu allows it, otherwise each voice normalizes inside inference
+        text, prepared = content_text, False
+        try:
+            text, prepared = await asyncio.to_thread(tts_service.prepare_text, content_text)
+        except Exception as e:
+            logger.warning(f"Shared TTS text frontend failed for news_id={news_id}: {e}")
+        results = await asyncio.gather(*(
+            self._generate_voice(content_text, text, prepared, voice) for voice in voices
+        ), return_exceptions=True)
+        audio_files = [r for r in results if not isinstance(r, Exception)]
+        errors = [r for r in results if isinstance(r, Exception)]
+        if not audio_files:
+            raise errors[0]
+        if errors:
+            logger.warning(
+                f"{len(errors)}/{len(voices)} voices failed for news_id={news_id}; "
+                f"they are retried on the next request"
+            )
 
-        for voice in self.voices:
-            try:
-                logger.info(f"Generating audio with voice: {voice[KEY_VOICE_ID]}")
-                result = tts_service.synthesize(
-                    text=content_text,
-                    voice_id=voice[KEY_VOICE_ID],
-                    upload_to_s3=True
-                )
+        # Previously stored voices are returned together with the new ones
+        by_voice = {audio[KEY_VOICE_ID]: audio for audio in stored}
+        by_voice.update((info[KEY_VOICE_ID], dict(info)) for info in audio_files)
+        response_files = [dict(audio) for audio in by_voice.values()]
 
-                audio_info = {
-                    KEY_VOICE_ID: voice[KEY_VOICE_ID],
-                    KEY_DESCRIPTION: voice[KEY_DESCRIPTION],
-                    KEY_URL: result.get(KEY_S3_URL),
-                    KEY_S3_KEY: result.get(KEY_S3_KEY),
-                    KEY_FILENAME: result.get(KEY_FILENAME)
-                }
+        # 4-5. Save to database while presigned URLs are added to the response;
+        #      the commit still completes before returning, so the next
+        #      request finds the audio instead of synthesizing it again
+        await asyncio.gather(
+            self._store_audio_files(news_id, result_id, audio_files, db),
+            self._attach_presigned_urls(response_files),
+        )
+        self._audio_cache[news_id] = list(by_voice.values())
 
-                # Cache the generated presigned url immediately if available
-                if result.get(KEY_S3_KEY) and result.get(KEY_PRESIGNED_URL):
-                    await self._cache_presigned_url(result.get(KEY_S3_KEY), result.get(KEY_PRESIGNED_URL))
+        return response_files, False
 
-                audio_files.append(audio_info)
-                logger.info(f"Successfully generated audio: {audio_info[KEY_S3_KEY]}")
+    async def _store_audio_files(
+            self,
+            news_id: int,
+            result_id: Optional[int],
+            audio_files: List[dict],
+            db: AsyncSession
+    ):
+        """Upsert the result row (if new) and the generated audio files, then commit."""
+        if result_id is None:
+            result_id = await self._upsert_result_id(news_id, db)
+        await self._upsert_audio_files(result_id, audio_files, db)
+        await db.commit()
+        logger.info(f"Stored {len(audio_files)} audio files for news_id={news_id}")
+
+    def _missing_voices(self, stored: List[dict]) -> List[dict]:
+        """Configured voices that have no stored audio file yet."""
+        stored_voices = {audio[KEY_VOICE_ID] for audio in stored}
+        return [voice for voice in self.voices if voice[KEY_VOICE_ID] not in stored_voices]
+
+    @staticmethod
+    async def _upsert_result_id(news_id: int, db: AsyncSession) -> int:
+        """
+        Id of the NewsAIResult row for a news item, creating it if needed.
 
-            except Exception as e:
-                logger.error(f"Failed to generate audio with voice {voice[KEY_VOICE_ID]}: {e}")
-                raise RuntimeError(f"TTS generation failed for voice {voice[KEY_VOICE_ID]}: {e}")
-
-        # 4. Save to database
-        if existing:
-            # Update existing record
-            existing.audio_files = audio_files
-            db.commit()
-            db.refresh(existing)
-            logger.info(f"Updated audio record for news_id={news_id}")
-        else:
-            # Create new record
-            news_ai_result = NewsAIResult(
-                news_id=news_id,
-                audio_files=audio_files
+        One atomic statement, so a concurrent summarization creating the
+        same row cannot make this fail.
+        """
+        stmt = pg_insert(NewsAIResult).values(news_id=news_id)
+        result = await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[NewsAIResult.news_id],
+                set_={"updated_at": func.now()}
+            ).returning(NewsAIResult.id)
+        )
+        return result.scalar_one()
+
+    @staticmethod
+    async def _upsert_audio_files(result_id: int, audio_files: List[dict], db: AsyncSession):
+        """Upsert one NewsAudioFile per voice in a single INSERT ... ON CONFLICT."""
+        stmt = pg_insert(NewsAudioFile).values([
+            {
+                "news_ai_result_id": result_id,
+                "voice_id": info[KEY_VOICE_ID],
+                "description": info.get(KEY_DESCRIPTION),
+                "url": info.get(KEY_URL),
+                "s3_key": info.get(KEY_S3_KEY),
+                "filename": info.get(KEY_FILENAME),
+            }
+            for info in audio_files
+        ])
+        await db.execute(stmt.on_conflict_do_update(
+            constraint="uq_news_audio_files_result_voice",
+            set_={
+                "description": stmt.excluded.description,
+                "url": stmt.excluded.url,
+                "s3_key": stmt.excluded.s3_key,
+                "filename": stmt.excluded.filename,
+            }
+        ))
+
+    async def _generate_voice(self, content_text: str, text: str, prepared: bool, voice: dict) -> dict:
+        """
+        Synthesize audio for one voice in a worker thread, then upload the
+        in-memory WAV to S3 asynchronously (no temporary file).
+        
+        Raises:
+            RuntimeError: If TTS generation fails
+        """
+        try:
+            logger.info(f"Generating audio with voice: {voice[KEY_VOICE_ID]}")
+            result = await asyncio.to_thread(
+                tts_service.synthesize_wav,
+                text=text,
+                voice_id=voice[KEY_VOICE_ID],
+                prepared=prepared
             )
-            db.add(news_ai_result)
-            db.commit()
-            db.refresh(news_ai_result)
-            logger.info(f"Created new AI result record for news_id={news_id}")
+            audio_bytes = result.pop("audio_bytes")
 
-        # Add presigned URLs to response
-        for audio in audio_files:
-            if KEY_S3_KEY in audio:
-                audio[KEY_PRESIGNED_URL] = await self._get_presigned_url_cached(audio[KEY_S3_KEY])
+            s3_key = await tts_storage.upload_bytes_async(
+                audio_bytes,
+                object_name=result[KEY_FILENAME],
+                metadata=tts_service.build_upload_metadata(
+                    content_text, voice[KEY_VOICE_ID], result[KEY_FILENAME]
+                )
+            )
+            if s3_key:
+                result[KEY_S3_KEY] = s3_key
+                result[KEY_S3_URL] = tts_storage.get_public_url(s3_key)
+                result[KEY_PRESIGNED_URL] = tts_storage.generate_presigned_url(s3_key, expiration=86400)
+            else:
+                logger.warning("S3 upload failed, keeping local file")
+                await asyncio.to_thread(tts_service.save_local, result[KEY_FILENAME], audio_bytes)
+
+            audio_info = {
+                KEY_VOICE_ID: voice[KEY_VOICE_ID],
+                KEY_DESCRIPTION: voice[KEY_DESCRIPTION],
+                KEY_URL: result.get(KEY_S3_URL),
+                KEY_S3_KEY: result.get(KEY_S3_KEY),
+                KEY_FILENAME: result.get(KEY_FILENAME)
+            }
+
+            # Cache the generated presigned url immediately if available
+            if result.get(KEY_S3_KEY) and result.get(KEY_PRESIGNED_URL):
+                await self._cache_presigned_url(result.get(KEY_S3_KEY), result.get(KEY_PRESIGNED_URL))
+
+            logger.info(f"Successfully generated audio: {audio_info[KEY_S3_KEY]}")
+            return audio_info
 
-        return audio_files, False
+        except Exception as e:
+            logger.error(f"Failed to generate audio with voice {voice[KEY_VOICE_ID]}: {e}")
+            raise RuntimeError(f"TTS generation failed for voice {voice[KEY_VOICE_ID]}: {e}")
 
     async def _cache_presigned_url(self, s3_key: str, url: str):
         """Helper to cache a freshly generated URL"""
         try:
-            redis = await self._get_redis()
+            redis = await cache.get_redis()
             if redis:
                 await redis.set(f"{TTS_PREFIX_KEY}:{s3_key}", url, ex=86400 - 60)
         except Exception as e:
             logger.warning(f"Failed to cache generated URL: {e}")
 
-    async def get_cached_audio(self, news_id: int, db: Session) -> Optional[List[dict]]:
+    async def get_stored_audio(self, news_id: int, db: AsyncSession) -> Optional[List[dict]]:
+        """
+        Get the stored audio rows of a news item, without presigned URLs.
+
+        The result is stable across URL re-signing, so it is what HTTP
+        validators (ETag) should be computed from. Do not mutate it: it is
+        the in-process cache entry.
+
+        Returns:
+            List of audio info dicts or None if not cached
+        """
+        audio_files = self._audio_cache.get(news_id)
+        if audio_files is None:
+            _, audio_files = await self._get_audio_rows(news_id, db)
+            if audio_files:
+                self._audio_cache[news_id] = audio_files
+        return audio_files or None
+
+    async def with_presigned_urls(self, audio_files: List[dict]) -> List[dict]:
+        """Copies of `audio_files` enriched with presigned URLs (the input is left untouched)."""
+        # Copy so presigned URLs never leak into the cached entry
+        result_files = [audio.copy() for audio in audio_files]
+        await self._attach_presigned_urls(result_files)
+        return result_files
+
+    async def get_cached_audio(self, news_id: int, db: AsyncSession) -> Optional[List[dict]]:
         """
         Get cached audio files for a news item without generating.
         
         Args:
             news_id: ID of the news item
-            db: Database session
+            db: Async database session
             
         Returns:
             List of audio info dicts or None if not cached
         """
-        existing = db.query(NewsAIResult).filter(NewsAIResult.news_id == news_id).first()
-        if existing and existing.audio_files:
-            # Enrich with presigned URLs from Redis
-            result_files = []
-            for audio in existing.audio_files:
-                # Create a copy to avoid modifying the DB object directly if it's attached
-                audio_data = audio.copy()
-                if KEY_S3_KEY in audio_data:
-                    audio_data[KEY_PRESIGNED_URL] = await self._get_presigned_url_cached(audio_data[KEY_S3_KEY])
-                result_files.append(audio_data)
-            return result_files
+        audio_files = await self.get_stored_audio(news_id, db)
+        if audio_files:
+            return await self.with_presigned_urls(audio_files)
         return None
 
-    async def delete_audio(self, news_id: int, db: Session) -> bool:
+    async def delete_audio(self, news_id: int, db: AsyncSession) -> bool:
         """
         Delete cached audio for a news item.
         
         Args:
             news_id: ID of the news item
-            db: Database session
+            db: Async database session
             
         Returns:
             True if deleted, False if not found
         """
-        existing = db.query(NewsAIResult).filter(NewsAIResult.news_id == news_id).first()
-        if existing:
+        self._audio_cache.pop(news_id, None)
+        result_id, stored = await self._get_audio_rows(news_id, db)
+        if result_id is not None:
+            s3_keys = [audio[KEY_S3_KEY] for audio in stored if audio.get(KEY_S3_KEY)]
             # Also delete keys from Redis
-            if existing.audio_files:
-                redis = await self._get_redis()
+            if s3_keys:
+                redis = await cache.get_redis()
                 if redis:
-                    for audio in existing.audio_files:
-                        s3_key = audio.get(KEY_S3_KEY)
-                        if s3_key:
-                            try:
-                                await redis.delete(f"{TTS_PREFIX_KEY}:{s3_key}")
-                            except Exception:
-                                pass
-
-            # TODO: Also delete files from MinIO
-            db.delete(existing)
-            db.commit()
+                    for s3_key in s3_keys:
+                        try:
+                            await redis.delete(f"{TTS_PREFIX_KEY}:{s3_key}")
+                        except Exception:
+                            pass
+
+            # Remove the audio objects from MinIO concurrently, on the event loop
+            await asyncio.gather(*(tts_storage.delete_object_async(s3_key) for s3_key in s3_keys))
+            # news_audio_files rows go with it (ON DELETE CASCADE)
+            await db.execute(delete(NewsAIResult).where(NewsAIResult.id == result_id))
+            await db.commit()
             logger.info(f"Deleted AI result record for news_id={news_id}")
             return True
         return False
@@ -1,22 +1,60 @@
+import importlib.metadata
+import inspect
+import io
 import logging
+import os
+import re
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 import hashlib
 
+import numpy as np
+
 from config import settings
+from services.tts import text_cache
 
 logger = logging.getLogger(__name__)
 
+# VieNeu's codec decodes to 24 kHz mono
+DEFAULT_SAMPLE_RATE = 24000
+
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_WHITESPACE_RE = re.compile(r'\s+')
+# Runs of the same punctuation mark ("!!!", ",,") read as one; ellipses are kept
+_REPEATED_PUNCT_RE = re.compile(r'([!?,;:])\1+')
+
+# Bump when _normalize_text changes; part of the text cache key
+TEXT_FRONTEND_VERSION = 1
+
+# Fade applied at both ends of each streamed sentence to hide boundary clicks
+_STREAM_FADE_SECONDS = 0.002
+
 
 class TTSService:
     """
     Text-to-Speech service using VieNeu TTS model.
     Implements singleton pattern to load model only once.
+    
+    The model does not support concurrent inference, so `synthesize` holds
+    a lock only around infer + save; S3 uploads run outside it and can
+    overlap with the next synthesis when called from several threads.
     """
 
     _instance: Optional['TTSService'] = None
     _tts_model = None
+    _model_lock = threading.Lock()
+    # voice_id -> resolved preset voice (reference codes + text)
+    _voice_cache: dict = {}
+    _default_voice_data = None
+    _preset_voices: list = []
+    # Whether the installed VieNeu's infer() accepts skip_normalize
+    _infer_skips_normalize = False
+    # Our frontend version + VieNeu's, so cached text from an older normalizer is not reused
+    _frontend_version = str(TEXT_FRONTEND_VERSION)
 
     def __new__(cls):
         if cls._instance is None:
@@ -35,26 +73,130 @@ class TTSService:
             from vieneu import Vieneu
 
             # Initialize with HuggingFace repo ID (uses cached model if available)
-            self._tts_model = Vieneu(backbone_repo=settings.tts_model_repo)
-            logger.info("VieNeu TTS model loaded successfully")
+            backbone_device = self._backbone_device()
+            self._tts_model = Vieneu(
+                backbone_repo=settings.tts_model_repo,
+                backbone_device=backbone_device,
+                codec_device=settings.tts_codec_device
+            )
+            self._cast_backbone(backbone_device)
+            self._infer_skips_normalize = (
+                "skip_normalize" in inspect.signature(self._tts_model.infer).parameters
+            )
+            self._frontend_version = f"{TEXT_FRONTEND_VERSION}:vieneu-{importlib.metadata.version('vieneu')}"
+            logger.info(f"VieNeu TTS model loaded successfully (backbone on {backbone_device})")
+            self._load_preset_voices()
 
         except Exception as e:
             logger.error(f"Failed to load TTS model: {str(e)}")
             raise RuntimeError(f"TTS model initialization failed: {str(e)}")
 
-    def generate_filename(self, text: str) -> str:
+    @staticmethod
+    def _backbone_device() -> str:
+        """
+        Configured backbone device. "auto" resolves to the GPU when one is
+        present: VieNeu offloads a GGUF backbone (all layers, flash attention)
+        only for "gpu", while a PyTorch backbone expects "cuda".
+        """
+        if settings.tts_backbone_device != "auto":
+            return settings.tts_backbone_device
+        try:
+            import torch
+            has_gpu = torch.cuda.is_available()
+        except ImportError:
+            has_gpu = False
+        if not has_gpu:
+            return "cpu"
+        return "gpu" if "gguf" in settings.tts_model_repo.lower() else "cuda"
+
+    def _cast_backbone(self, device: str):
+        """
+        Run a PyTorch backbone in half precision on CUDA (same policy as
+        PhoBERT/ViT5, see `inference_dtype`), or with dynamically quantized
+        int8 Linear layers on CPU when `tts_backbone_int8` is set. GGUF
+        backbones are already quantized and run inside llama.cpp, so they
+        are left alone.
+        """
+        import torch
+        from services.torch_runtime import inference_dtype
+
+        backbone = getattr(self._tts_model, "backbone", None)
+        if not isinstance(backbone, torch.nn.Module):
+            return
+        if not str(device).startswith("cuda"):
+            if settings.tts_backbone_int8:
+                self._tts_model.backbone = torch.ao.quantization.quantize_dynamic(
+                    backbone, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                logger.info("TTS backbone Linear layers quantized to int8")
+            return
+        dtype = inference_dtype(device)
+        if dtype != torch.float32:
+            backbone.to(dtype)
+            logger.info(f"TTS backbone cast to {dtype}")
+
+    def _load_preset_voices(self):
+        """
+        Resolve every preset voice once, so inference never converts the
+        reference codes again, and pick the default voice up front.
+        """
+        try:
+            self._preset_voices = self._tts_model.list_preset_voices()
+            logger.info(f"Available voices: {len(self._preset_voices)}")
+        except Exception as e:
+            logger.error(f"Failed to list voices: {str(e)}")
+            self._preset_voices = []
+        self._voice_cache = {
+            voice_id: self._tts_model.get_preset_voice(voice_id)
+            for _, voice_id in self._preset_voices
+        }
+        default_voice_id = settings.default_tts_voice
+        self._default_voice_data = self._voice_cache.get(default_voice_id)
+        if self._default_voice_data is None and self._voice_cache:
+            # Fallback to first available voice
+            fallback_voice_id = next(iter(self._voice_cache))
+            logger.warning(
+                f"Configured default voice '{default_voice_id}' not available, "
+                f"falling back to: {fallback_voice_id}"
+            )
+            self._default_voice_data = self._voice_cache[fallback_voice_id]
+        logger.info(f"Preloaded {len(self._voice_cache)} preset voices")
+
+    def _get_voice_data(self, voice_id: Optional[str] = None):
+        """Resolved preset voice for `voice_id`, or the default voice."""
+        if not voice_id:
+            if self._default_voice_data is None:
+                raise RuntimeError("No preset voices available")
+            return self._default_voice_data
+        voice_data = self._voice_cache.get(voice_id)
+        if voice_data is None:
+            # Not listed at load time; raises for unknown voices
+            voice_data = self._voice_cache[voice_id] = self._tts_model.get_preset_voice(voice_id)
+        return voice_data
+
+    def generate_filename(self, text: str, voice_id: Optional[str] = None, extension: str = "wav") -> str:
         """
         Generate unique filename for audio output.
         
         Args:
             text: Input text (used for hash)
+            voice_id: Voice used, so several voices for the same text don't collide
+            extension: File extension matching the audio encoding
             
         Returns:
             Unique filename with timestamp and hash
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        text_hash = hashlib.md5(text.encode()).hexdigest()[:8]
-        return f"tts_{timestamp}_{text_hash}.wav"
+        text_hash = hashlib.blake2b(f"{voice_id or ''}:{text}".encode(), digest_size=4).hexdigest()
+        return f"tts_{timestamp}_{text_hash}.{extension}"
+
+    def build_upload_metadata(self, text: str, voice_id: Optional[str], filename: str) -> dict:
+        """Build the S3 object metadata for a generated audio file."""
+        return {
+            'text_length': len(text),
+            'voice_id': voice_id or settings.default_tts_voice,
+            'generated_at': filename.split('_')[1] + '_' + filename.split('_')[2].split('.')[0]
+        }
 
     def list_voices(self) -> list[tuple[str, str]]:
         """
@@ -63,13 +205,225 @@ class TTSService:
         Returns:
             List of tuples containing (description, voice_id)
         """
+        return self._preset_voices
+
+    def _synthesize_wav(
+            self,
+            text: str,
+            voice_id: Optional[str],
+            ref_audio: Optional[str],
+            ref_text: Optional[str],
+            prepared: bool = False
+    ) -> dict:
+        """`synthesize_wav` without the error wrapping."""
+        logger.info("Synthesizing text: %s...", text[:50])
+        filename = self.generate_filename(text, voice_id)
+        if not prepared:
+            text, prepared = self.prepare_text(text)
+        with self._model_lock:
+            audio = self._infer(text, voice_id, ref_audio, ref_text, prepared)
+        return {
+            'filename': filename,
+            'audio_bytes': self.to_wav_bytes(audio)
+        }
+
+    def to_wav_bytes(self, audio) -> bytes:
+        """Encode a waveform as an in-memory WAV file (same format as the model's `save`)."""
+        import soundfile as sf
+
+        buffer = io.BytesIO()
+        sf.write(buffer, np.asarray(audio), self.sample_rate, format="WAV")
+        return buffer.getvalue()
+
+    def to_opus_bytes(self, audio, bitrate: int = 24000) -> bytes:
+        """
+        Encode a waveform as an in-memory Ogg/Opus file (requires PyAV).
+
+        Speech at 24 kbps is a small fraction of the 16-bit PCM size.
+        """
+        from services.tts.audio_stream import encode_ogg_opus
+
+        pcm = np.asarray(audio, dtype=np.float32)
+        return b"".join(encode_ogg_opus([pcm], self.sample_rate, bitrate))
+
+    def synthesize_wav(
+            self,
+            text: str,
+            voice_id: Optional[str] = None,
+            ref_audio: Optional[str] = None,
+            ref_text: Optional[str] = None,
+            prepared: bool = False
+    ) -> dict:
+        """
+        Convert text to speech without touching the disk.
+        
+        The lock covers inference only; WAV encoding runs outside it.
+        
+        Args:
+            prepared: `text` was returned by `prepare_text` together with
+                True, so the voice-independent normalization is skipped
+        
+        Returns:
+            Dict containing:
+                - filename: Generated filename
+                - audio_bytes: WAV file contents
+            
+        Raises:
+            RuntimeError: If synthesis fails
+        """
         try:
-            available_voices = self._tts_model.list_preset_voices()
-            logger.info(f"Available voices: {len(available_voices)}")
-            return available_voices
+            return self._synthesize_wav(text, voice_id, ref_audio, ref_text, prepared)
         except Exception as e:
-            logger.error(f"Failed to list voices: {str(e)}")
-            return []
+            logger.error(f"TTS synthesis failed: {str(e)}")
+            raise RuntimeError(f"Failed to generate speech: {str(e)}")
+
+    def _infer(
+            self,
+            text: str,
+            voice_id: Optional[str] = None,
+            ref_audio: Optional[str] = None,
+            ref_text: Optional[str] = None,
+            prepared: bool = False
+    ):
+        """
+        Run the TTS model and return the waveform.
+
+        Inference runs under `torch.inference_mode` here rather than at the
+        call sites: grad mode is per thread, and synthesis runs on worker
+        threads.
+        """
+        import torch
+
+        infer_kwargs = {}
+        if not prepared:
+            text = self._normalize_text(text)
+        else:
+            # prepare_text only prepares when infer() can skip normalizing
+            infer_kwargs["skip_normalize"] = True
+        # Generate audio
+        if ref_audio and ref_text:
+            logger.info("Using voice cloning with reference audio: %s", ref_audio)
+            with torch.inference_mode():
+                audio = self._tts_model.infer(
+                    text=text,
+                    ref_audio=ref_audio,
+                    ref_text=ref_text,
+                    **infer_kwargs
+                )
+        else:
+            # Use specified voice_id or default voice from settings
+            logger.info("Using preset voice: %s", voice_id or settings.default_tts_voice)
+            voice_data = self._get_voice_data(voice_id)
+            with torch.inference_mode():
+                audio = self._tts_model.infer(text=text, voice=voice_data, **infer_kwargs)
+
+        return audio
+
+    def prepare_text(self, text: str) -> tuple[str, bool]:
+        """
+        Run the voice-independent text frontend (our cleanup plus VieNeu's
+        normalizer) once, outside the model lock, so text rendered in several
+        voices can be passed to `synthesize_wav` with `prepared=True`.
+
+        Only VieNeu releases that expose their normalizer and whose `infer`
+        accepts `skip_normalize` allow this; older ones (such as 1.1.7)
+        normalize inside `infer` on every call, so the text is returned
+        unchanged and unprepared.
+
+        Returns:
+            Text to synthesize and whether it is prepared
+        """
+        if not self._infer_skips_normalize or getattr(self._tts_model, "normalizer", None) is None:
+            return text, False
+        return text_cache.get_or_compute(text, self._run_frontend, self._frontend_version), True
+
+    def _run_frontend(self, text: str) -> str:
+        """`prepare_text` without the availability check and the disk cache."""
+        text = self._normalize_text(text)
+        normalizer = getattr(self._tts_model, "normalizer", None)
+        if normalizer is None:
+            return text
+        return normalizer.normalize(text)
+
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """
+        Collapse whitespace and repeated punctuation before inference.
+
+        Both only lengthen the phoneme sequence the backbone attends over
+        without changing what is spoken. The text is never truncated:
+        VieNeu already splits long input into chunks.
+        """
+        normalized = _WHITESPACE_RE.sub(' ', _REPEATED_PUNCT_RE.sub(r'\1', text)).strip()
+        if len(normalized) != len(text):
+            logger.debug(f"TTS input normalized: {len(text)} -> {len(normalized)} chars")
+        return normalized
+
+    @property
+    def sample_rate(self) -> int:
+        """Output sample rate of the TTS model."""
+        return getattr(self._tts_model, "sample_rate", DEFAULT_SAMPLE_RATE)
+
+    def synthesize_stream(
+            self,
+            text: str,
+            voice_id: Optional[str] = None,
+            ref_audio: Optional[str] = None,
+            ref_text: Optional[str] = None
+    ) -> Iterator[np.ndarray]:
+        """
+        Synthesize text sentence by sentence, yielding each waveform as soon
+        as it is ready so callers can start sending audio before the whole
+        text is done.
+        
+        Synthesis runs one sentence ahead on a worker thread: while the
+        caller encodes and sends sentence N, sentence N+1 is already being
+        generated.
+        
+        Yields:
+            1-D float32 PCM arrays at `sample_rate`
+        """
+        sentences = [s for s in _SENTENCE_SPLIT_RE.split(text.strip()) if s.strip()] or [text]
+        logger.info(f"Streaming synthesis of {len(sentences)} sentences")
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-stream") as pool:
+            ahead = pool.submit(self.synthesize_pcm, sentences[0], voice_id, ref_audio, ref_text)
+            try:
+                for i in range(len(sentences)):
+                    audio = ahead.result()
+                    if i + 1 < len(sentences):
+                        ahead = pool.submit(
+                            self.synthesize_pcm, sentences[i + 1], voice_id, ref_audio, ref_text
+                        )
+                    yield audio
+            finally:
+                # Client went away: don't start a sentence nobody will hear
+                ahead.cancel()
+
+    def synthesize_pcm(
+            self,
+            text: str,
+            voice_id: Optional[str] = None,
+            ref_audio: Optional[str] = None,
+            ref_text: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Synthesize one sentence as float32 PCM at `sample_rate`, with short
+        fades at both ends so consecutive sentences join without clicks.
+        
+        The text frontend runs before taking the model lock, so when several
+        threads synthesize in turn (streaming, test_tts) the next sentence
+        is normalized while the current one is in the model.
+        """
+        text, prepared = self.prepare_text(text)
+        with self._model_lock:
+            audio = self._infer(text, voice_id, ref_audio, ref_text, prepared)
+        audio = np.array(audio, dtype=np.float32).reshape(-1)
+        fade = min(int(self.sample_rate * _STREAM_FADE_SECONDS), len(audio) // 2)
+        if fade > 0:
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            audio[:fade] *= ramp
+            audio[-fade:] *= ramp[::-1]
+        return audio
 
     def synthesize(
             self,
@@ -101,78 +455,37 @@ class TTSService:
             RuntimeError: If synthesis fails
         """
         try:
-            logger.info(f"Synthesizing text: {text[:50]}...")
-
-            # Generate audio
-            if ref_audio and ref_text:
-                logger.info(f"Using voice cloning with reference audio: {ref_audio}")
-                audio = self._tts_model.infer(
-                    text=text,
-                    ref_audio=ref_audio,
-                    ref_text=ref_text
-                )
-            else:
-                # Use specified voice_id or default voice from settings
-                if voice_id:
-                    logger.info(f"Using preset voice: {voice_id}")
-                    voice_data = self._tts_model.get_preset_voice(voice_id)
-                else:
-                    # Use default voice from settings
-                    default_voice_id = settings.default_tts_voice
-                    logger.info(f"Using default voice from settings: {default_voice_id}")
-                    try:
-                        voice_data = self._tts_model.get_preset_voice(default_voice_id)
-                    except Exception as e:
-                        logger.warning(f"Failed to load configured default voice '{default_voice_id}': {e}")
-                        # Fallback to first available voice
-                        available_voices = self.list_voices()
-                        if available_voices:
-                            _, fallback_voice_id = available_voices[0]
-                            logger.info(f"Falling back to first available voice: {fallback_voice_id}")
-                            voice_data = self._tts_model.get_preset_voice(fallback_voice_id)
-                        else:
-                            raise RuntimeError("No preset voices available")
-                
-                audio = self._tts_model.infer(text=text, voice=voice_data)
-
-            # Generate filename and save
-            filename = self.generate_filename(text)
-            output_path = settings.tts_output_path / filename
-
-            logger.info(f"Saving audio to: {output_path}")
-            self._tts_model.save(audio, str(output_path))
-
-            result = {
-                'filename': filename,
-                'local_path': str(output_path)
-            }
-
-            # Upload to S3 if requested
+            # Upload to S3 if requested, straight from memory
             if upload_to_s3:
                 from .storage import tts_storage
-                
-                metadata = {
-                    'text_length': len(text),
-                    'voice_id': voice_id or settings.default_tts_voice,
-                    'generated_at': filename.split('_')[1] + '_' + filename.split('_')[2].split('.')[0]
-                }
-                
-                s3_key = tts_storage.upload_file(
-                    file_path=str(output_path),
+
+                wav = self._synthesize_wav(text, voice_id, ref_audio, ref_text)
+                filename = wav['filename']
+                result = {'filename': filename}
+                s3_key = tts_storage.upload_bytes(
+                    wav['audio_bytes'],
                     object_name=filename,
-                    metadata=metadata,
-                    delete_local=True
+                    metadata=self.build_upload_metadata(text, voice_id, filename)
                 )
-                
+
                 if s3_key:
                     result['s3_key'] = s3_key
                     result['s3_url'] = tts_storage.get_public_url(s3_key)
                     result['presigned_url'] = tts_storage.generate_presigned_url(s3_key, expiration=86400)  # 24 hours
                     logger.info(f"Audio uploaded to S3: {s3_key}")
-                    # Remove local_path from result since file was deleted
-                    result.pop('local_path', None)
                 else:
                     logger.warning("S3 upload failed, keeping local file")
+                    result['local_path'] = str(self.save_local(filename, wav['audio_bytes']))
+
+                logger.info(f"Audio generated successfully: {filename}")
+                return result
+
+            wav = self._synthesize_wav(text, voice_id, ref_audio, ref_text)
+            filename = wav['filename']
+            result = {
+                'filename': filename,
+                'local_path': str(self.save_local(filename, wav['audio_bytes']))
+            }
 
             logger.info(f"Audio generated successfully: {filename}")
             return result
@@ -181,20 +494,40 @@ class TTSService:
             logger.error(f"TTS synthesis failed: {str(e)}")
             raise RuntimeError(f"Failed to generate speech: {str(e)}")
 
-    def get_audio_path(self, filename: str) -> Optional[Path]:
+    def save_local(self, filename: str, audio_bytes: bytes) -> Path:
+        """Write encoded audio under the TTS output dir (served by GET /tts/audio/{filename})."""
+        output_path = settings.tts_output_path / filename
+        output_path.write_bytes(audio_bytes)
+        return output_path
+
+    def warmup(self):
+        """Run one short inference so the first real request doesn't pay for it."""
+        import torch
+
+        from services.constants import WARMUP_TEXT
+
+        with self._model_lock, torch.inference_mode():
+            self._tts_model.infer(text=WARMUP_TEXT, voice=self._get_voice_data())
+        logger.info("TTS model warmed up")
+
+    def get_audio_file(self, filename: str) -> Optional[tuple[Path, os.stat_result]]:
         """
-        Get full path to audio file if it exists.
+        Get full path and stat of an audio file if it exists (a single stat).
         
         Args:
             filename: Audio filename
             
         Returns:
-            Path to audio file or None if not found
+            (path, stat result) of a regular file, or None if not found
         """
         file_path = settings.tts_output_path / filename
-        if file_path.exists() and file_path.is_file():
-            return file_path
-        return None
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+        return file_path, stat_result
 
 
 # Global service instance
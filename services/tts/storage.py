@@ -1,18 +1,61 @@
 """
 TTS Storage Service - S3 upload for generated audio files
 """
+import asyncio
+import io
 import logging
-import os
+from contextlib import AsyncExitStack
 from pathlib import Path
 from typing import Optional
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from cachetools import TTLCache
 
 from config import settings
+from services.constants import AUDIO_CONTENT_TYPES, DEFAULT_AUDIO_CONTENT_TYPE
 
 logger = logging.getLogger(__name__)
 
+# aiobotocore lets uploads run on the event loop; otherwise they go to a thread
+try:
+    from aiobotocore.session import get_session as _get_aio_session
+    HAS_AIOBOTOCORE = True
+except ImportError:
+    HAS_AIOBOTOCORE = False
+    logger.warning("aiobotocore not installed, async S3 uploads will use a worker thread")
+
+
+# Presigned URLs are reused for this long; they are signed for this much
+# longer than requested so a reused URL still has the full lifetime left
+PRESIGNED_URL_REUSE_SECONDS = 300
+# SigV4 presigned URLs cannot be valid for more than 7 days
+MAX_PRESIGNED_URL_EXPIRATION = 7 * 24 * 3600
+
+# Bodies this large are sent as parallel multipart uploads; smaller parts
+# (the 5 MB minimum) cost more in per-part requests than they gain
+MULTIPART_PART_SIZE = 16 * 1024 * 1024
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_PART_SIZE,
+    multipart_chunksize=MULTIPART_PART_SIZE,
+    max_concurrency=8
+)
+
+
+# Presigned URLs are signed locally; pin SigV4 and path-style addressing
+# (MinIO/SeaweedFS) so botocore never has to work out either per request.
+# The pool covers a full multipart transfer plus concurrent small requests,
+# and keep-alive lets the singleton clients reuse connections across calls
+_CLIENT_CONFIG = Config(
+    signature_version='s3v4',
+    s3={'addressing_style': 'path'},
+    max_pool_connections=16,
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'standard'}
+)
+
 
 class TTSStorageService:
     """
@@ -22,6 +65,12 @@ class TTSStorageService:
 
     _instance: Optional['TTSStorageService'] = None
     _s3_client = None
+    _async_s3_client = None
+    _async_exit_stack: Optional[AsyncExitStack] = None
+    # Serializes creating/closing the async client between concurrent first callers
+    _async_client_lock = asyncio.Lock()
+    # (s3_key, expiration) -> recently signed URL
+    _presigned_urls: TTLCache = TTLCache(maxsize=10_000, ttl=PRESIGNED_URL_REUSE_SECONDS)
 
     def __new__(cls):
         if cls._instance is None:
@@ -43,7 +92,8 @@ class TTSStorageService:
                 endpoint_url=settings.s3_endpoint_url,
                 aws_access_key_id=settings.s3_access_key,
                 aws_secret_access_key=settings.s3_secret_key,
-                region_name='us-east-1'  # Required but value doesn't matter for SeaweedFS
+                region_name='us-east-1',  # Required but value doesn't matter for SeaweedFS
+                config=_CLIENT_CONFIG
             )
             
             # Ensure bucket exists
@@ -74,73 +124,114 @@ class TTSStorageService:
                 logger.error(f"Error checking bucket: {e}")
                 raise
 
-    def upload_file(
+    @staticmethod
+    def get_object_key(object_name: str) -> str:
+        """S3 key an audio object named `object_name` is uploaded under."""
+        return f"{settings.s3_audio_prefix}/{object_name}"
+
+    def _upload_args(self, object_name: str, metadata: Optional[dict]) -> tuple[str, dict]:
+        """S3 key and extra arguments (content type, metadata) for an audio upload."""
+        s3_key = self.get_object_key(object_name)
+        extra_args = {'ContentType': AUDIO_CONTENT_TYPES.get(Path(object_name).suffix, DEFAULT_AUDIO_CONTENT_TYPE)}
+        if metadata:
+            extra_args['Metadata'] = {k: str(v) for k, v in metadata.items()}
+        return s3_key, extra_args
+
+    def upload_bytes(
         self,
-        file_path: str,
-        object_name: Optional[str] = None,
-        metadata: Optional[dict] = None,
-        delete_local: bool = True
+        body: bytes,
+        object_name: str,
+        metadata: Optional[dict] = None
     ) -> Optional[str]:
         """
-        Upload audio file to S3 storage.
+        Upload in-memory audio to S3 storage (nothing is written to disk).
         
         Args:
-            file_path: Path to local file
-            object_name: S3 object name (default: uses filename)
+            body: Encoded audio file contents
+            object_name: S3 object name
             metadata: Optional metadata dict
-            delete_local: Whether to delete local file after upload (default: True)
             
         Returns:
             S3 object key if successful, None otherwise
         """
-        if not os.path.exists(file_path):
-            logger.error(f"File not found: {file_path}")
-            return None
-
-        if object_name is None:
-            object_name = os.path.basename(file_path)
-
-        # Add prefix for organization
-        s3_key = f"{settings.s3_audio_prefix}/{object_name}"
-
+        s3_key, extra_args = self._upload_args(object_name, metadata)
         try:
-            # Prepare extra args
-            extra_args = {
-                'ContentType': 'audio/wav'
-            }
-            
-            if metadata:
-                extra_args['Metadata'] = {k: str(v) for k, v in metadata.items()}
-
-            # Upload file
-            logger.info(f"Uploading to S3: {file_path} -> s3://{settings.s3_bucket_name}/{s3_key}")
-            self._s3_client.upload_file(
-                file_path,
+            logger.info(f"Uploading to S3: {len(body)} bytes -> s3://{settings.s3_bucket_name}/{s3_key}")
+            self._s3_client.upload_fileobj(
+                io.BytesIO(body),
                 settings.s3_bucket_name,
                 s3_key,
-                ExtraArgs=extra_args
+                ExtraArgs=extra_args,
+                Config=_TRANSFER_CONFIG
             )
-
-            file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
-            logger.info(f"Upload successful: {s3_key} ({file_size:.2f} MB)")
-
-            # Delete local file if requested
-            if delete_local:
-                try:
-                    os.remove(file_path)
-                    logger.info(f"Local file deleted: {file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete local file {file_path}: {e}")
-
+            logger.info(f"Upload successful: {s3_key} ({len(body) / (1024 * 1024):.2f} MB)")
             return s3_key
-
-        except ClientError as e:
+        except Exception as e:
             logger.error(f"S3 upload failed: {e}")
             return None
+
+    async def upload_bytes_async(
+        self,
+        body: bytes,
+        object_name: str,
+        metadata: Optional[dict] = None
+    ) -> Optional[str]:
+        """
+        Upload in-memory audio to S3 storage without blocking the event loop.
+        
+        Same contract as `upload_bytes`. Bodies of at least
+        `MULTIPART_PART_SIZE` go through the threaded multipart transfer
+        (8 parts in flight) rather than a single-stream PUT.
+        """
+        if not HAS_AIOBOTOCORE or len(body) >= MULTIPART_PART_SIZE:
+            return await asyncio.to_thread(self.upload_bytes, body, object_name, metadata)
+
+        s3_key, extra_args = self._upload_args(object_name, metadata)
+        try:
+            logger.info(f"Uploading to S3: {len(body)} bytes -> s3://{settings.s3_bucket_name}/{s3_key}")
+            client = await self._get_async_client()
+            await client.put_object(
+                Bucket=settings.s3_bucket_name,
+                Key=s3_key,
+                Body=body,
+                **extra_args
+            )
+            logger.info(f"Upload successful: {s3_key} ({len(body) / (1024 * 1024):.2f} MB)")
+            return s3_key
         except Exception as e:
-            logger.error(f"Unexpected error during upload: {e}")
+            logger.error(f"Async S3 upload failed: {e}")
             return None
 
+    async def _get_async_client(self):
+        """Get or create the shared aiobotocore S3 client (lazy initialization)."""
+        if self._async_s3_client is not None:
+            return self._async_s3_client
+        async with self._async_client_lock:
+            # Another caller may have created it while we waited
+            if self._async_s3_client is None:
+                stack = AsyncExitStack()
+                client = await stack.enter_async_context(
+                    _get_aio_session().create_client(
+                        's3',
+                        endpoint_url=settings.s3_endpoint_url,
+                        aws_access_key_id=settings.s3_access_key,
+                        aws_secret_access_key=settings.s3_secret_key,
+                        region_name='us-east-1',
+                        config=_CLIENT_CONFIG
+                    )
+                )
+                self._async_exit_stack = stack
+                self._async_s3_client = client
+        return self._async_s3_client
+
+    async def close(self):
+        """Close the async S3 client (called on application shutdown)."""
+        async with self._async_client_lock:
+            if self._async_exit_stack is not None:
+                await self._async_exit_stack.aclose()
+                self._async_exit_stack = None
+                self._async_s3_client = None
+
     def generate_presigned_url(
         self,
         s3_key: str,
@@ -149,6 +240,11 @@ class TTSStorageService:
         """
         Generate a presigned URL for accessing audio file.
         
+        Signing is local (no request to the storage server). A URL
+        signed for the same key within the last
+        PRESIGNED_URL_REUSE_SECONDS is returned again, which skips
+        re-signing and gives clients a stable, browser-cacheable URL.
+        
         Args:
             s3_key: S3 object key
             expiration: URL expiration time in seconds (default: 1 hour)
@@ -156,6 +252,11 @@ class TTSStorageService:
         Returns:
             Presigned URL or None if failed
         """
+        cache_key = (s3_key, expiration)
+        url = self._presigned_urls.get(cache_key)
+        if url is not None:
+            return url
+
         try:
             url = self._s3_client.generate_presigned_url(
                 'get_object',
@@ -163,9 +264,10 @@ class TTSStorageService:
                     'Bucket': settings.s3_bucket_name,
                     'Key': s3_key
                 },
-                ExpiresIn=expiration
+                ExpiresIn=min(expiration + PRESIGNED_URL_REUSE_SECONDS, MAX_PRESIGNED_URL_EXPIRATION)
             )
             logger.info(f"Generated presigned URL for {s3_key} (expires in {expiration}s)")
+            self._presigned_urls[cache_key] = url
             return url
         except ClientError as e:
             logger.error(f"Failed to generate presigned URL: {e}")
@@ -192,6 +294,27 @@ class TTSStorageService:
             logger.error(f"Failed to delete object: {e}")
             return False
 
+    async def delete_object_async(self, s3_key: str) -> bool:
+        """
+        Delete object from S3 without blocking the event loop.
+        
+        Same contract as `delete_object`.
+        """
+        if not HAS_AIOBOTOCORE:
+            return await asyncio.to_thread(self.delete_object, s3_key)
+
+        try:
+            client = await self._get_async_client()
+            await client.delete_object(
+                Bucket=settings.s3_bucket_name,
+                Key=s3_key
+            )
+            logger.info(f"Deleted S3 object: {s3_key}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete object: {e}")
+            return False
+
     def get_public_url(self, s3_key: str) -> str:
         """
         Get public URL for S3 object (if bucket is public).
@@ -0,0 +1,81 @@
+"""
+Bounded on-disk cache of TTS text frontend output, keyed by the SHA-256 of
+the frontend version and the input text.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_dir() -> Path:
+    return Path(settings.tts_text_cache_dir).expanduser()
+
+
+def get_or_compute(text: str, compute_fn: Callable[[str], str], version: str) -> str:
+    """
+    Return the cached result for `text`, or run `compute_fn(text)` and store it.
+
+    Entries are one UTF-8 file per key, written to a unique temp file and
+    renamed into place so concurrent writers never expose a partial entry.
+    `version` identifies the frontend that produced the entry, so results
+    of an older normalizer are never reused. Cache I/O errors fall back to
+    computing the result.
+    """
+    if not settings.tts_text_cache_dir:
+        return compute_fn(text)
+
+    key = hashlib.sha256(f"{version}\0{text}".encode()).hexdigest()
+    path = _cache_dir() / f"{key}.txt"
+    try:
+        result = path.read_text(encoding="utf-8")
+        # Hits count as recent use for eviction
+        os.utime(path)
+        return result
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"TTS text cache read failed: {e}")
+
+    result = compute_fn(text)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(result)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        _evict(path.parent)
+    except OSError as e:
+        logger.warning(f"TTS text cache write failed: {e}")
+    return result
+
+
+def _evict(cache_dir: Path):
+    """Delete the least recently used entries beyond `tts_text_cache_max_entries`."""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".txt"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+    surplus = len(entries) - settings.tts_text_cache_max_entries
+    if surplus <= 0:
+        return
+    entries.sort()
+    for _, entry_path in entries[:surplus]:
+        try:
+            os.unlink(entry_path)
+        except FileNotFoundError:
+            pass
@@ -1,72 +1,266 @@
 #!/usr/bin/env python3
-"""TTS test: gen .wav → upload MinIO → xóa local → trả về kết quả của synthesize()."""
+"""TTS test: gen audio (Opus mặc định, hoặc WAV) trong memory → upload MinIO → trả về kết quả giống synthesize()."""
+import asyncio
 import logging
-import json
+import re
+import sys
+from collections import deque
+from functools import cache, lru_cache
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+import orjson
+
+from services.tts.audio_stream import HAS_PYAV
+from services.tts.service import tts_service
+from services.tts.storage import tts_storage
 
 logging.basicConfig(level=logging.INFO)
 
+# Tách câu theo . ! ? để tổng hợp từng đoạn
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+# Số câu xử lý đồng thời
+MAX_CONCURRENT = 3
+
+
+@cache
+def _service():
+    """
+    TTS service dùng chung (model load một lần khi import), warm-up ở lần
+    gọi đầu để lần test_tts đầu tiên không phải trả chi phí đó.
+    """
+    tts_service.warmup()
+    return tts_service
+
+
+# Warm-up ngay khi import để lần test_tts đầu tiên đo đúng độ trễ ổn định
+_service()
+
+
+@lru_cache(maxsize=1)
+def _voices() -> tuple:
+    """Danh sách voice (desc, id), chỉ đọc một lần mỗi process."""
+    return tuple(_service().list_voices())
+
+
+def split_sentences(text: str) -> list[str]:
+    """Tách text thành các câu (bỏ câu rỗng)."""
+    return [s for s in map(str.strip, SENTENCE_SPLIT_RE.split(text)) if s] or [text]
+
+
+class OrderlyParallelProcessor:
+    """
+    Xử lý tối đa `max_concurrent` item cùng lúc, nhưng gọi `on_result`
+    đúng theo thứ tự đưa vào (item xong sớm được giữ trong `pending`
+    tới lượt).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        process_item: Callable[[Any], Awaitable[Any]],
+        on_result: Callable[[Any], None],
+    ):
+        self.max_concurrent = max_concurrent
+        self.process_item = process_item
+        self.on_result = on_result
+        self._queue: deque = deque()
+        self._pending: dict[int, Any] = {}
+        self._next_index = 0
+        self._next_emit = 0
+        self._running = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    def push(self, item: Any):
+        """Thêm item vào hàng đợi và chạy ngay nếu còn slot."""
+        self._queue.append((self._next_index, item))
+        self._next_index += 1
+        self._start_next()
+
+    def _start_next(self):
+        while self._running < self.max_concurrent and self._queue:
+            index, item = self._queue.popleft()
+            # Tăng counter ngay (đồng bộ) trước khi tạo task để không vượt max_concurrent
+            self._running += 1
+            task = asyncio.create_task(self._run(index, item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, index: int, item: Any):
+        try:
+            self._pending[index] = await self.process_item(item)
+        finally:
+            self._running -= 1
+        # Phát kết quả theo thứ tự
+        while self._next_emit in self._pending:
+            self.on_result(self._pending.pop(self._next_emit))
+            self._next_emit += 1
+        self._start_next()
+
+    async def drain(self):
+        """Chờ mọi item đã push xử lý xong (raise lỗi đầu tiên nếu có)."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+
+def create_tts_orderly_parallel_processor(
+    max_concurrent: int,
+    process_item: Callable[[Any], Awaitable[Any]],
+    on_result: Callable[[Any], None],
+) -> OrderlyParallelProcessor:
+    """Processor gen TTS song song, trả kết quả theo thứ tự câu."""
+    return OrderlyParallelProcessor(max_concurrent, process_item, on_result)
 
-def test_tts(
+
+async def synthesize_and_upload(text: str, voice_id: str = None, audio_format: str = "opus") -> dict:
+    """
+    Gen từng câu song song (theo thứ tự), ghép PCM, encode ("opus" hoặc "wav")
+    rồi upload một object.
+
+    Upload chạy nền: key và presigned URL được tính trước (ký local), hàm
+    trả về ngay, caller await `upload_future` khi cần chắc chắn object đã lên
+    MinIO (kết quả là s3_key, hoặc None nếu upload lỗi và file được lưu local).
+
+    Returns:
+        Dict giống synthesize() (filename, s3_key, s3_url, presigned_url) + upload_future
+    """
+    svc = _service()
+    segments: list[np.ndarray] = []
+    processor = create_tts_orderly_parallel_processor(
+        max_concurrent=MAX_CONCURRENT,
+        # CPU/GPU-bound: chạy trong thread (model lock vẫn tuần tự hóa inference)
+        process_item=lambda chunk: asyncio.to_thread(svc.synthesize_pcm, chunk, voice_id),
+        on_result=segments.append,
+    )
+    for chunk in split_sentences(text):
+        processor.push(chunk)
+    await processor.drain()
+
+    audio = np.concatenate(segments)
+    if audio_format == "opus":
+        audio_bytes = svc.to_opus_bytes(audio)
+        filename = svc.generate_filename(text, voice_id, extension="ogg")
+    else:
+        audio_bytes = svc.to_wav_bytes(audio)
+        filename = svc.generate_filename(text, voice_id)
+    metadata = svc.build_upload_metadata(text, voice_id, filename)
+
+    async def upload():
+        # Network-bound: upload async từ memory, không ghi file local.
+        # Client S3 dùng chung cả process, caller đóng nó khi xong (xem main())
+        s3_key = await tts_storage.upload_bytes_async(audio_bytes, object_name=filename, metadata=metadata)
+        if not s3_key:
+            local_path = svc.save_local(filename, audio_bytes)
+            logging.warning(f"S3 upload failed, audio kept at {local_path}")
+        return s3_key
+
+    s3_key = tts_storage.get_object_key(filename)
+    return {
+        "filename": filename,
+        "s3_key": s3_key,
+        "s3_url": tts_storage.get_public_url(s3_key),
+        "presigned_url": tts_storage.generate_presigned_url(s3_key, expiration=86400),
+        "upload_future": asyncio.create_task(upload()),
+    }
+
+
+async def test_tts(
     text: str,
     voice_id: str = None,
     upload_to_s3: bool = True,
+    audio_format: str = "opus",
+    verbose: bool = True,
 ):
     """
     Gen speech từ text, upload lên MinIO (S3), xóa file local, trả về đúng dict của synthesize().
 
+    Khi upload_to_s3=True, text được tách câu và gen song song (tối đa
+    MAX_CONCURRENT câu), ghép lại theo thứ tự rồi upload một object.
+
     Args:
         text: Câu tiếng Việt cần tổng hợp.
         voice_id: Voice ID (vd 'Binh', 'Doan'). None = dùng default.
-        upload_to_s3: True = upload MinIO và xóa local (mặc định).
+        upload_to_s3: True = upload MinIO, không ghi file local (mặc định).
+        audio_format: "opus" (Ogg/Opus 24 kbps, mặc định) hoặc "wav" khi upload;
+            không có PyAV thì dùng "wav".
+        verbose: In kết quả (JSON) ra màn hình; caller trong code nên truyền False.
 
     Returns:
-        Dict trả về từ services.tts.service.tts_service.synthesize():
-        - filename, s3_key, s3_url, presigned_url (khi upload_to_s3=True)
+        Dict giống services.tts.service.tts_service.synthesize():
+        - filename, s3_key, s3_url, presigned_url, upload_future (khi upload_to_s3=True;
+          await upload_future trước khi dùng URL)
         - hoặc filename, local_path (khi upload_to_s3=False)
     """
-    from services.tts.service import tts_service
+    svc = _service()
 
-    print("Available voices:")
-    for desc, name in tts_service.list_voices():
-        print(f"   - {desc} (ID: {name})")
-    print()
+    # Gom output rồi ghi một lần (mỗi print là một lần write/flush stdout)
+    out = []
+    # Chỉ in danh sách voice khi bật DEBUG
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        out.append("Available voices:")
+        out.extend(f"   - {desc} (ID: {name})" for desc, name in _voices())
+        out.append("")
 
-    if voice_id:
-        print(f"Using voice: {voice_id}")
+    out.append(f"Using voice: {voice_id}" if voice_id else "Using default voice")
+    out.append(f"Text: {text[:100]}{'...' if len(text) > 100 else ''}")
+    out.append(f"Upload to S3 (MinIO): {upload_to_s3}")
+    out.append("Generating...")
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
+
+    if audio_format == "opus" and not HAS_PYAV:
+        audio_format = "wav"
+
+    if upload_to_s3:
+        result = await synthesize_and_upload(text, voice_id, audio_format)
     else:
-        print("Using default voice")
-    print(f"Text: {text[:100]}{'...' if len(text) > 100 else ''}")
-    print(f"Upload to S3 (MinIO): {upload_to_s3}")
-    print("Generating...")
-
-    result = tts_service.synthesize(
-        text=text,
-        voice_id=voice_id,
-        upload_to_s3=upload_to_s3,
-    )
+        result = await asyncio.to_thread(
+            svc.synthesize,
+            text=text,
+            voice_id=voice_id,
+            upload_to_s3=False,
+        )
 
-    print("\n" + "=" * 60)
-    print("✓ Generation Complete!")
-    print("=" * 60)
-    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if not verbose:
+        return result
 
+    printable = {k: v for k, v in result.items() if k != "upload_future"}
+    out = [
+        "",
+        "=" * 60,
+        "✓ Generation Complete!",
+        "=" * 60,
+        orjson.dumps(printable, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode(),
+    ]
     if "s3_url" in result:
-        print(f"\n📦 S3 key: {result['s3_key']}")
-        print(f"🔗 S3 URL: {result['s3_url']}")
-        print(f"🔗 Presigned (24h): {result['presigned_url']}")
+        out.append(f"\n📦 S3 key: {result['s3_key']}")
+        out.append(f"🔗 S3 URL: {result['s3_url']}")
+        out.append(f"🔗 Presigned (24h): {result['presigned_url']}")
     elif "local_path" in result:
-        print(f"\n📁 Local file: {result['local_path']}")
+        out.append(f"\n📁 Local file: {result['local_path']}")
+    sys.stdout.write("\n".join(out) + "\n")
 
     return result
 
 
-if __name__ == "__main__":
-    # Mặc định: gen .wav → upload MinIO → xóa local → trả về dict của synthesize()
-    print("=== TTS: Generate → Upload MinIO → Delete local ===\n")
-    result = test_tts(
+async def main():
+    result = await test_tts(
         "Từng được xem là bảo chứng phòng vé của điện ảnh Hong Kong (Trung Quốc) suốt hơn hai thập niên, "
         "Cổ Thiên Lạc bước vào năm 2026 với một dự án mang nhiều kỳ vọng - bản điện ảnh Tầm Tần ký, "
         "hậu truyện của series kinh điển Cỗ máy thời gian.",
         upload_to_s3=True,
     )
-    # result chính là dict mà synthesize() trả về (filename, s3_key, s3_url, presigned_url)
+    try:
+        # Chờ upload nền xong trước khi event loop đóng
+        if await result["upload_future"]:
+            print("\n✓ Upload xong")
+    finally:
+        await tts_storage.close()
+    return result
+
+
+if __name__ == "__main__":
+    # Mặc định: gen từng câu song song → ghép audio → upload MinIO (nền) → trả về dict
+    print("=== TTS: Generate → Upload MinIO ===\n")
+    result = asyncio.run(main())
+    # result giống dict mà synthesize() trả về (filename, s3_key, s3_url, presigned_url)